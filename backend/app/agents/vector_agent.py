@@ -48,20 +48,20 @@ class VectorAgent:
             if course_id:
                 match_filter["course_id"] = course_id
 
-            # Build MongoDB aggregation pipeline for vector search
+            # Build MongoDB aggregation pipeline for vector search; the
+            # filter runs inside $vectorSearch so candidate selection is
+            # already user-scoped rather than pruned after the fact
             pipeline = [
                 {
                     "$vectorSearch": {
                         "index": "vector_search_index",  # Must be created in Atlas
                         "path": "embedding",
                         "queryVector": query_embedding,
-                        "numCandidates": 100,
-                        "limit": limit
+                        "numCandidates": max(100, limit * 15),
+                        "limit": limit,
+                        "filter": match_filter  # User isolation - DO NOT REMOVE
                     }
                 },
-                {
-                    "$match": match_filter  # User isolation - DO NOT REMOVE
-                },
                 {
                     "$project": {
                         "_id": 1,
@@ -477,15 +477,14 @@ async def get_assignments_by_course(
                 "$lte": future_date
             }
 
-        # Fetch assignments from database, sorted by due_date
+        # Fetch assignments from database, sorted by due_date; the course is
+        # fixed for this endpoint so resolve its info once, then build
+        # responses as docs stream in
         cursor = db.assignments.find(query).sort("due_date", 1)
-        assignments_docs = await cursor.to_list(length=None)
+        course_info = await get_course_info(db, course_id, db_user_id)
 
         assignments = []
-        for doc in assignments_docs:
-            # Get course information (we already have it, but using helper for consistency)
-            course_info = await get_course_info(db, course_id, db_user_id)
-            
+        async for doc in cursor:
             assignments.append(CanvasAssignmentResponse(
                 id=doc.get("canvas_id", str(doc["_id"])),
                 name=doc.get("title", "Unnamed Assignment"),
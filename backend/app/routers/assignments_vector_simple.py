@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from bson import ObjectId
 from typing import List
+import asyncio
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
 from app.services.embedder import embed_text
@@ -28,7 +29,8 @@ async def vector_simple_search(
     db = Depends(get_database),
 ):
     uid = await _resolve_user_id(db, user)
-    qvec = embed_text(q)
+    # model inference blocks; keep it off the event loop
+    qvec = await asyncio.to_thread(embed_text, q)
 
     pipeline = [
         {
@@ -246,11 +246,10 @@ async def get_upcoming_events(
             "start_time": {"$gte": now, "$lte": end_date}
         }).sort("start_time", 1).limit(limit)
 
-        events_docs = await cursor.to_list(length=None)
-
-        # Convert to response model
+        # Convert to response model as docs stream in, instead of
+        # materializing the raw docs first
         events = []
-        for doc in events_docs:
+        async for doc in cursor:
             events.append(CalendarEventResponse(
                 id=str(doc["_id"]),
                 user_id=doc["user_id"],
@@ -335,14 +334,11 @@ async def get_events(
 
         # Fetch events, sorted by start time
         cursor = db.calendar_events.find(query).sort("start_time", 1)
-        events_docs = await cursor.to_list(length=None)
-
-        # Count total events
-        total_events = len(events_docs)
 
-        # Convert to response model
+        # Convert to response model as docs stream in, instead of holding
+        # the raw docs and the responses in memory at once
         events = []
-        for doc in events_docs:
+        async for doc in cursor:
             events.append(CalendarEventResponse(
                 id=str(doc["_id"]),
                 user_id=doc["user_id"],
@@ -363,7 +359,7 @@ async def get_events(
 
         return CalendarEventsResponse(
             events=events,
-            total=total_events
+            total=len(events)
         )
 
     except HTTPException:
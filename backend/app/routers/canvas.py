@@ -4,11 +4,15 @@ Canvas LMS integration routes
 from fastapi import APIRouter, HTTPException, Depends, status
 from datetime import datetime, timedelta
 from bson import ObjectId
+from itertools import chain
+from pymongo import UpdateOne
 from typing import List, Optional
 
+import asyncio
+import os
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
-from app.services.canvas_service import CanvasService
+from app.services.canvas_service import async_canvas_service, create_context_codes
 from app.models.schemas import (
     CanvasTokenUpdate,
     CanvasTokenResponse,
@@ -27,10 +31,24 @@ import httpx
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
 from app.models.schemas import CanvasSyncResponse
-from app.services.embedder import embed_text
+from app.services.embedder import embed_text, embed_texts
 
 router = APIRouter(prefix="/canvas", tags=["Canvas"])
 
+# How many course syncs run in flight at once; overridable per deployment
+_SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "8"))
+
+# Per-user locks so only one /canvas/sync runs at a time for a given user
+_sync_locks = {}
+
+# Event colors by context, built once instead of per mapped event
+_EVENT_COLORS = {
+    "user_self": "#4285F4",  # Blue for personal events
+    "academic": "#0F9D58",    # Green for academic events
+    "assignment": "#DB4437",  # Red for assignments
+    "quiz": "#F4B400"         # Yellow for quizzes
+}
+
 @router.post("/test-connection")
 async def test_canvas_connection(
     token_data: CanvasTokenUpdate,
@@ -39,26 +57,31 @@ async def test_canvas_connection(
     """Test Canvas API connection with provided token"""
     try:
         base_url = token_data.canvas_base_url or "https://canvas.instructure.com"
-        
-        # Initialize Canvas service
-        canvas_service = CanvasService(base_url, token_data.canvas_token)
-        
-        # Test connection
-        result = canvas_service.test_connection()
-        
-        if result["success"]:
-            return {
-                "success": True,
-                "message": "Canvas connection successful",
-                "user": result["user"],
-                "canvas_url": result["canvas_url"]
-            }
-        else:
+
+        # Hit the self profile endpoint; a 200 proves the token works
+        try:
+            canvas_user = await async_canvas_service._make_request(
+                "GET", "users/self", token_data.canvas_token, base_url
+            )
+        except httpx.HTTPStatusError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Canvas connection failed: {result['error']}"
+                detail=f"Canvas connection failed: {e.response.status_code} {e.response.reason_phrase}"
             )
-            
+
+        return {
+            "success": True,
+            "message": "Canvas connection successful",
+            "user": {
+                "id": canvas_user.get("id"),
+                "name": canvas_user.get("name"),
+                "email": canvas_user.get("email") or canvas_user.get("login_id")
+            },
+            "canvas_url": base_url
+        }
+
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -118,6 +141,8 @@ async def save_canvas_token(
                 detail="User not found"
             )
 
+        _invalidate_canvas_config(user_id, email)
+
         return CanvasTokenResponse(
             success=True,
             message="Canvas token saved successfully",
@@ -207,6 +232,8 @@ async def delete_canvas_token(
                 detail="User not found"
             )
 
+        _invalidate_canvas_config(user_id, email)
+
         return CanvasTokenResponse(
             success=True,
             message="Canvas token removed successfully",
@@ -221,16 +248,41 @@ async def delete_canvas_token(
             detail=f"Failed to delete Canvas token: {str(e)}"
         )
 
+# In-process TTL cache for Canvas config lookups. The token and base URL
+# rarely change, but every Canvas endpoint re-reads them from Mongo, so a
+# 5-minute cache removes one round-trip per request. Writes that change the
+# cached document (token save/delete, tracked courses) must invalidate.
+_CONFIG_CACHE_TTL = 300  # seconds
+_CONFIG_CACHE_MAX = 10_000
+_config_cache = {}
+
+def _invalidate_canvas_config(user_id: str, email: str):
+    """Drop a user's cached Canvas config after their user doc changes"""
+    _config_cache.pop((user_id, email), None)
+
+# Only the fields Canvas endpoints actually read off the user doc
+_CONFIG_PROJECTION = {
+    "canvas_token": 1,
+    "canvas_base_url": 1,
+    "tracked_course_ids": 1,
+    "email": 1
+}
+
 async def get_user_canvas_config(user_id: str, email: str, db):
     """Helper function to get user's Canvas configuration"""
+    cache_key = (user_id, email)
+    cached = _config_cache.get(cache_key)
+    if cached and cached[0] > datetime.utcnow().timestamp():
+        return cached[1]
+
     user_doc = None
     try:
-        user_doc = await db.users.find_one({"_id": ObjectId(user_id)})
+        user_doc = await db.users.find_one({"_id": ObjectId(user_id)}, _CONFIG_PROJECTION)
     except:
         pass
 
     if not user_doc:
-        user_doc = await db.users.find_one({"email": email})
+        user_doc = await db.users.find_one({"email": email}, _CONFIG_PROJECTION)
 
     if not user_doc or "canvas_token" not in user_doc:
         raise HTTPException(
@@ -238,91 +290,96 @@ async def get_user_canvas_config(user_id: str, email: str, db):
             detail="Canvas token not configured. Please add your Canvas token first."
         )
 
-    return {
+    config = {
         "token": user_doc["canvas_token"],
         "base_url": user_doc.get("canvas_base_url", "https://canvas.instructure.com"),
         "user_doc": user_doc
     }
+
+    # Only cache successful lookups, and keep the cache bounded
+    if len(_config_cache) >= _CONFIG_CACHE_MAX:
+        _config_cache.clear()
+    _config_cache[cache_key] = (datetime.utcnow().timestamp() + _CONFIG_CACHE_TTL, config)
+
+    return config
     
 async def fetch_canvas_calendar_events(config, tracked_course_ids, start_date=None, end_date=None):
     """Fetch calendar events from Canvas API for tracked courses"""
     try:
-        # Prepare context codes for filtering (course_123, course_456, etc.)
-        context_codes = [f"course_{course_id}" for course_id in tracked_course_ids]
-        
-        # Add user's personal calendar
-        context_codes.append("user_self")
-        
-        if not context_codes:
-            return []
-            
+        # Prepare context codes for filtering (course_123, ..., user_self);
+        # memoized since the tracked set rarely changes between refreshes
+        context_codes = create_context_codes(tracked_course_ids)
+
+
         # Prepare query parameters
-        params = {
-            "context_codes[]": context_codes,
+        base_params = {
             "per_page": 100,
             "all_events": "true",  # Include assignments, calendar events, etc.
             "type": "event"  # Focus on calendar events first
         }
-        
+
         # Add date filters if provided
         if start_date:
-            params["start_date"] = start_date.isoformat()
+            base_params["start_date"] = start_date.isoformat()
         if end_date:
-            params["end_date"] = end_date.isoformat()
-            
-        # Fetch calendar events from Canvas
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{config['base_url']}/api/v1/calendar_events",
-                headers={"Authorization": f"Bearer {config['token']}"},
-                params=params
-            )
-            
-            if response.status_code != 200:
-                print(f"Failed to fetch calendar events: {response.status_code} {response.text}")
-                return []
+            base_params["end_date"] = end_date.isoformat()
+
+        # Canvas serializes work per context code and long code lists bloat
+        # the URL, so fetch in chunks of 10 contexts concurrently
+        code_chunks = [context_codes[i:i + 10] for i in range(0, len(context_codes), 10)]
+
+        try:
+            chunk_results = await asyncio.gather(*[
+                async_canvas_service._make_request(
+                    "GET", "calendar_events", config["token"], config["base_url"],
+                    params={**base_params, "context_codes[]": chunk}, paginate=True
+                )
+                for chunk in code_chunks
+            ])
+            events_data = list(chain.from_iterable(chunk_results))
+        except httpx.HTTPStatusError as e:
+            print(f"Failed to fetch calendar events: {e.response.status_code} {e.response.text}")
+            return []
+
+        # Convert to our schema
+        events = []
+        for event in events_data:
+            # Determine event type
+            event_type = CanvasCalendarEventType.CALENDAR
+            if "assignment" in event:
+                event_type = CanvasCalendarEventType.ASSIGNMENT
+            elif "discussion_topic" in event:
+                event_type = CanvasCalendarEventType.DISCUSSION
+            elif "quiz" in event:
+                event_type = CanvasCalendarEventType.QUIZ
                 
-            events_data = response.json()
+            # Extract context name (course name or "Personal")
+            context_name = "Personal"
+            context_code = event.get("context_code", "")
+            if context_code.startswith("course_"):
+                course_id = context_code.split("_")[1]
+                # Try to find course name
+                for course_id_str in tracked_course_ids:
+                    if str(course_id) == str(course_id_str):
+                        # This is a tracked course, get its name
+                        context_name = f"Course {course_id}"  # Default if we can't find the name
+                        break
             
-            # Convert to our schema
-            events = []
-            for event in events_data:
-                # Determine event type
-                event_type = CanvasCalendarEventType.CALENDAR
-                if "assignment" in event:
-                    event_type = CanvasCalendarEventType.ASSIGNMENT
-                elif "discussion_topic" in event:
-                    event_type = CanvasCalendarEventType.DISCUSSION
-                elif "quiz" in event:
-                    event_type = CanvasCalendarEventType.QUIZ
-                    
-                # Extract context name (course name or "Personal")
-                context_name = "Personal"
-                context_code = event.get("context_code", "")
-                if context_code.startswith("course_"):
-                    course_id = context_code.split("_")[1]
-                    # Try to find course name
-                    for course_id_str in tracked_course_ids:
-                        if str(course_id) == str(course_id_str):
-                            # This is a tracked course, get its name
-                            context_name = f"Course {course_id}"  # Default if we can't find the name
-                            break
-                
-                events.append(CanvasCalendarEvent(
-                    id=str(event["id"]),
-                    title=event.get("title", "Untitled Event"),
-                    description=event.get("description"),
-                    start_at=event.get("start_at"),
-                    end_at=event.get("end_at"),
-                    location_name=event.get("location_name"),
-                    context_code=event.get("context_code", ""),
-                    context_name=context_name,
-                    html_url=event.get("html_url"),
-                    all_day=event.get("all_day", False),
-                    type=event_type
-                ))
-                
-            return events
+            events.append(CanvasCalendarEvent(
+                id=str(event["id"]),
+                title=event.get("title", "Untitled Event"),
+                description=event.get("description"),
+                start_at=event.get("start_at"),
+                end_at=event.get("end_at"),
+                location_name=event.get("location_name"),
+                context_code=event.get("context_code", ""),
+                context_name=context_name,
+                html_url=event.get("html_url"),
+                all_day=event.get("all_day", False),
+                type=event_type
+            ))
+            
+        return events
             
     except Exception as e:
         print(f"Error fetching Canvas calendar events: {str(e)}")
@@ -344,26 +401,18 @@ def map_canvas_event_to_calendar_event(canvas_event, user_id):
     elif canvas_event.type == CanvasCalendarEventType.QUIZ:
         event_type = EventType.ACADEMIC
         
-    # Generate a color based on the context_code
-    colors = {
-        "user_self": "#4285F4",  # Blue for personal events
-        "academic": "#0F9D58",    # Green for academic events
-        "assignment": "#DB4437",  # Red for assignments
-        "quiz": "#F4B400"         # Yellow for quizzes
-    }
-    
     # Default color based on event type
-    color = colors.get("academic")
-    
+    color = _EVENT_COLORS["academic"]
+
     # If it's a personal event, use that color
     if canvas_event.context_code == "user_self":
-        color = colors.get("user_self")
-    
+        color = _EVENT_COLORS["user_self"]
+
     # If it's an assignment or quiz, use those colors
     if canvas_event.type == CanvasCalendarEventType.ASSIGNMENT:
-        color = colors.get("assignment")
+        color = _EVENT_COLORS["assignment"]
     elif canvas_event.type == CanvasCalendarEventType.QUIZ:
-        color = colors.get("quiz")
+        color = _EVENT_COLORS["quiz"]
     
     # Create event document
     now = datetime.utcnow()
@@ -409,43 +458,36 @@ async def get_canvas_courses(
     user=Depends(verify_backend_token),
     db=Depends(get_database)
 ):
-    """Get user's Canvas courses using canvasapi library"""
+    """Get user's Canvas courses"""
     try:
         user_id = user.get("sub")
         email = user.get("email")
 
         config = await get_user_canvas_config(user_id, email, db)
 
-        # Get user's tracked courses
+        # Get user's tracked courses (as a set for O(1) membership checks)
         user_doc = config.get("user_doc", {})
-        tracked_course_ids = user_doc.get("tracked_course_ids", [])
-
-        # Initialize Canvas service
-        canvas_service = CanvasService(config["base_url"], config["token"])
-        
-        # Fetch courses from Canvas using canvasapi
-        courses = canvas_service.get_courses(enrollment_state="active", per_page=100)
-        course_responses = []
-
-        for course in courses:
-            course_id = str(course["id"])
-            is_tracked = course_id in tracked_course_ids
+        tracked_course_ids = set(user_doc.get("tracked_course_ids", []))
 
-            # If user has tracked courses, only return those
-            if tracked_course_ids and not is_tracked:
-                continue
+        # Fetch courses from Canvas (SWR-cached in Mongo)
+        courses = await async_canvas_service.get_courses(
+            config["token"], config["base_url"], db=db, cache_key=email
+        )
 
-            course_responses.append(CanvasCourseResponse(
-                id=course_id,
+        # If user has tracked courses, only return those
+        return [
+            CanvasCourseResponse(
+                id=str(course["id"]),
                 name=course.get("name", ""),
                 course_code=course.get("course_code", ""),
                 enrollment_term_id=course.get("enrollment_term_id"),
                 start_at=course.get("start_at"),
                 end_at=course.get("end_at"),
-                is_tracked=is_tracked
-            ))
-
-        return course_responses
+                is_tracked=str(course["id"]) in tracked_course_ids
+            )
+            for course in courses
+            if not tracked_course_ids or str(course["id"]) in tracked_course_ids
+        ]
 
     except ValueError as e:
         raise HTTPException(
@@ -492,6 +534,8 @@ async def track_courses(
                 detail="User not found"
             )
 
+        _invalidate_canvas_config(user_id, email)
+
         return TrackCoursesResponse(
             success=True,
             message=f"Now tracking {len(track_request.course_ids)} courses",
@@ -508,74 +552,99 @@ async def track_courses(
 
 @router.get("/assignments", response_model=List[CanvasAssignmentResponse])
 async def get_canvas_assignments(
+    weeks: Optional[int] = None,
     user=Depends(verify_backend_token),
     db=Depends(get_database)
 ):
-    """Get assignments from tracked Canvas courses using canvasapi library"""
+    """Get assignments from tracked Canvas courses (optionally due within N weeks)"""
     try:
         user_id = user.get("sub")
         email = user.get("email")
 
+        # Canvas due_at strings are UTC ISO-8601, which sort lexicographically
+        # in chronological order - so the window filter below compares raw
+        # strings and never pays a datetime parse per assignment
+        now_iso = None
+        future_iso = None
+        if weeks is not None:
+            now = datetime.utcnow()
+            now_iso = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+            future_iso = (now + timedelta(weeks=weeks)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
         config = await get_user_canvas_config(user_id, email, db)
 
         # Get user's tracked courses
         user_doc = config.get("user_doc", {})
-        tracked_course_ids = user_doc.get("tracked_course_ids", [])
+        tracked_course_ids = set(user_doc.get("tracked_course_ids", []))
 
         # If no tracked courses, return empty list
         if not tracked_course_ids:
             return []
 
-        # Initialize Canvas service
-        canvas_service = CanvasService(config["base_url"], config["token"])
-        
-        # Fetch courses from Canvas using canvasapi
-        courses = canvas_service.get_courses(enrollment_state="active", per_page=100)
+        # Fetch courses once (SWR-cached in Mongo), then all tracked courses'
+        # assignments concurrently (no more one-request-per-course in series)
+        courses = await async_canvas_service.get_courses(
+            config["token"], config["base_url"], db=db, cache_key=email
+        )
+        tracked_courses = [c for c in courses if str(c["id"]) in tracked_course_ids]
+
+        # With a weeks window, push the filter down to Canvas: bucket=upcoming
+        # drops past/undated assignments server-side, so only the future-bound
+        # check remains to do locally
+        assignment_lists = await asyncio.gather(
+            *[
+                async_canvas_service.get_course_assignments(
+                    str(course["id"]), config["token"], config["base_url"],
+                    bucket="upcoming" if weeks is not None else None,
+                    order_by="due_at" if weeks is not None else None
+                )
+                for course in tracked_courses
+            ],
+            return_exceptions=True
+        )
+
         all_assignments = []
 
-        # Get assignments for each tracked course only
-        for course in courses:
+        for course, assignments in zip(tracked_courses, assignment_lists):
             course_id = str(course["id"])
 
-            # Skip if not tracked
-            if course_id not in tracked_course_ids:
-                continue
-
-            try:
-                assignments = canvas_service.get_course_assignments(int(course_id), per_page=100)
-                
-                for assignment in assignments:
-                    # Get submission status from Canvas
-                    submission = assignment.get("submission", {})
-                    workflow_state = submission.get("workflow_state", "unsubmitted")
-
-                    # Map Canvas workflow_state to our assignment_status
-                    # Note: Canvas can only set not_started or completed
-                    # "in_progress" can ONLY be set manually by the user
-                    if workflow_state in ["submitted", "pending_review", "graded", "complete"]:
-                        assignment_status = "completed"  # Student has submitted
-                    else:
-                        assignment_status = "not_started"
-
-                    all_assignments.append(CanvasAssignmentResponse(
-                        id=str(assignment["id"]),
-                        name=assignment.get("name", "Unnamed Assignment"),
-                        description=assignment.get("description"),
-                        due_at=assignment.get("due_at"),
-                        course_id=course_id,
-                        course_name=course.get("name", "Unknown Course"),
-                        course_code=course.get("course_code", ""),
-                        points_possible=assignment.get("points_possible"),
-                        submission_types=assignment.get("submission_types", []),
-                        status=assignment_status,
-                        canvas_workflow_state=workflow_state
-                    ))
-                    
-            except ValueError as e:
+            if isinstance(assignments, Exception):
                 # Course not accessible, skip it
-                print(f"Warning: Could not access course {course_id}: {str(e)}")
+                print(f"Warning: Could not access course {course_id}: {assignments}")
                 continue
 
+            for assignment in assignments:
+                if now_iso is not None:
+                    due_at = assignment.get("due_at")
+                    if not due_at or due_at < now_iso or due_at > future_iso:
+                        continue
+
+                # Get submission status from Canvas
+                submission = assignment.get("submission", {})
+                workflow_state = submission.get("workflow_state", "unsubmitted")
+
+                # Map Canvas workflow_state to our assignment_status
+                # Note: Canvas can only set not_started or completed
+                # "in_progress" can ONLY be set manually by the user
+                if workflow_state in ["submitted", "pending_review", "graded", "complete"]:
+                    assignment_status = "completed"  # Student has submitted
+                else:
+                    assignment_status = "not_started"
+
+                all_assignments.append(CanvasAssignmentResponse(
+                    id=str(assignment["id"]),
+                    name=assignment.get("name", "Unnamed Assignment"),
+                    description=assignment.get("description"),
+                    due_at=assignment.get("due_at"),
+                    course_id=course_id,
+                    course_name=course.get("name", "Unknown Course"),
+                    course_code=course.get("course_code", ""),
+                    points_possible=assignment.get("points_possible"),
+                    submission_types=assignment.get("submission_types", []),
+                    status=assignment_status,
+                    canvas_workflow_state=workflow_state
+                ))
+
         # Sort assignments by due_date (None values at the end)
         all_assignments.sort(key=lambda x: (x.due_at is None, x.due_at))
 
@@ -612,20 +681,12 @@ async def sync_canvas_data(
         user_id = user.get("sub")
         email = user.get("email")
 
-        # ---- Resolve Canvas config (your existing helper) ----
+        # ---- Resolve Canvas config (already carries the user doc) ----
         config = await get_user_canvas_config(user_id, email, db)
-
-        # ---- Resolve user + tracked courses ----
-        user_doc = None
-        try:
-            user_doc = await db.users.find_one({"_id": ObjectId(user_id)})
-        except Exception:
-            pass
-        if not user_doc:
-            user_doc = await db.users.find_one({"email": email})
+        user_doc = config["user_doc"]
 
         db_user_id = str(user_doc["_id"]) if user_doc else str(user_id)
-        tracked_course_ids: List[str] = user_doc.get("tracked_course_ids", []) if user_doc else []
+        tracked_course_ids = set(user_doc.get("tracked_course_ids", [])) if user_doc else set()
 
         if not tracked_course_ids:
             return CanvasSyncResponse(
@@ -635,29 +696,37 @@ async def sync_canvas_data(
                 assignments_synced=0
             )
 
-        courses_synced = 0
-        assignments_synced = 0
-        assignments_embedded = 0  # NEW: count embeddings we computed
-
-        async with httpx.AsyncClient() as client:
-            # ---- Fetch active courses ----
-            courses_response = await client.get(
-                f"{config['base_url']}/api/v1/courses",
-                headers={"Authorization": f"Bearer {config['token']}"},
-                params={"enrollment_state": "active", "per_page": 100}
-            )
-            if courses_response.status_code != 200:
+        # Single-flight per user: two concurrent syncs would race the same
+        # upserts and double the Canvas traffic, so the second caller waits
+        # (and then finishes quickly thanks to the unchanged-skip logic)
+        sync_lock = _sync_locks.setdefault(db_user_id, asyncio.Lock())
+        async with sync_lock:
+            # ---- Fetch active courses (shared pooled client) ----
+            try:
+                courses = await async_canvas_service._make_request(
+                    "GET", "courses", config["token"], config["base_url"],
+                    params={"enrollment_state": "active", "per_page": 100},
+                    paginate=True
+                )
+            except httpx.HTTPStatusError:
                 raise HTTPException(
                     status_code=status.HTTP_502_BAD_GATEWAY,
                     detail="Failed to fetch courses from Canvas"
                 )
-            courses = courses_response.json()
 
-            # ---- Sync only tracked courses ----
-            for course in courses:
+            # ---- Sync tracked courses concurrently ----
+            # Each course sync is independent I/O, so fan out with a bounded
+            # semaphore instead of awaiting one course at a time
+            sync_semaphore = asyncio.Semaphore(_SYNC_CONCURRENCY)
+
+            # One timestamp per sync cycle: every document written in this run
+            # shares it, instead of a clock read (and object allocation) per doc
+            sync_now = datetime.utcnow()
+
+            async def sync_one_course(course):
                 course_id = str(course["id"])
-                if course_id not in tracked_course_ids:
-                    continue
+                course_assignments_synced = 0
+                course_assignments_embedded = 0
 
                 # upsert course
                 await db.canvas_courses.update_one(
@@ -670,33 +739,56 @@ async def sync_canvas_data(
                         "enrollment_term_id": course.get("enrollment_term_id"),
                         "start_at": course.get("start_at"),
                         "end_at": course.get("end_at"),
-                        "synced_at": datetime.utcnow()
+                        "synced_at": sync_now
                     }},
                     upsert=True
                 )
-                courses_synced += 1
 
                 # ---- Fetch assignments for this course ----
-                assignments_response = await client.get(
-                    f"{config['base_url']}/api/v1/courses/{course_id}/assignments",
-                    headers={"Authorization": f"Bearer {config['token']}"},
-                    params={"per_page": 100, "include[]": "submission"}
-                )
-                if assignments_response.status_code != 200:
-                    continue
+                async with sync_semaphore:
+                    try:
+                        # Sync needs submissions for status mapping; dashboards
+                        # that don't should pass include_submission=False
+                        assignments = await async_canvas_service.get_course_assignments(
+                            course_id, config["token"], config["base_url"],
+                            include_submission=True
+                        )
+                    except httpx.HTTPStatusError:
+                        return 1, 0, 0
+                # ---- Pass 1: resolve existing docs and decide what needs embedding ----
+                # One $in query replaces a find_one per assignment — a single
+                # round-trip per course instead of N
+                assignment_ids = [str(assignment["id"]) for assignment in assignments]
+                # Project to the fields the change-detection logic reads
+                # (embedding stays: unchanged assignments carry their prior
+                # vector forward instead of re-embedding)
+                existing_map = {
+                    doc["canvas_id"]: doc
+                    async for doc in db.assignments.find(
+                        {
+                            "canvas_id": {"$in": assignment_ids},
+                            "user_id": db_user_id
+                        },
+                        {
+                            "canvas_id": 1,
+                            "status": 1,
+                            "title": 1,
+                            "description": 1,
+                            "embedding": 1,
+                            "canvas_updated_at": 1
+                        }
+                    )
+                }
 
-                assignments = assignments_response.json()
+                pending = []
+                texts_to_embed = []
                 for assignment in assignments:
                     canvas_assignment_id = str(assignment["id"])
                     submission = assignment.get("submission", {}) or {}
                     workflow_state = submission.get("workflow_state", "unsubmitted")
                     canvas_status = _map_canvas_status(workflow_state)
 
-                    # Check existing doc
-                    existing = await db.assignments.find_one({
-                        "canvas_id": canvas_assignment_id,
-                        "user_id": db_user_id
-                    })
+                    existing = existing_map.get(canvas_assignment_id)
 
                     # Preserve manual in_progress
                     if existing and existing.get("status") == "in_progress":
@@ -709,57 +801,130 @@ async def sync_canvas_data(
                     due_at = assignment.get("due_at")  # ISO string; you can parse to datetime if needed
                     text_for_embedding = _join_title_desc(title, description)
 
+                    has_embedding = bool(existing) and isinstance(existing.get("embedding"), list) \
+                        and len(existing["embedding"]) > 0
+
+                    # Skip untouched assignments entirely: Canvas bumps
+                    # updated_at on any edit to the assignment, and the
+                    # submission-driven status is compared directly, so when both
+                    # match the stored doc is already current — no re-embed, no
+                    # upsert op, no write
+                    canvas_updated_at = assignment.get("updated_at")
+                    if (
+                        existing is not None
+                        and canvas_updated_at is not None
+                        and existing.get("canvas_updated_at") == canvas_updated_at
+                        and existing.get("status") == final_status
+                        and (has_embedding or not text_for_embedding)
+                    ):
+                        course_assignments_synced += 1
+                        continue
+
                     # Decide whether to (re)embed
                     need_embed = True
                     if existing:
                         prev_title = existing.get("title", "")
                         prev_desc = existing.get("description", "")
-                        has_embedding = isinstance(existing.get("embedding"), list) and len(existing.get("embedding")) > 0
                         # if content unchanged and we already have an embedding, skip re-embedding
                         if prev_title == title and (prev_desc or "") == (description or "") and has_embedding:
                             need_embed = False
 
-                    embedding_vec = []
+                    embed_index = None
                     if need_embed and text_for_embedding:
-                        embedding_vec = embed_text(text_for_embedding)
+                        embed_index = len(texts_to_embed)
+                        texts_to_embed.append(text_for_embedding)
+
+                    pending.append({
+                        "canvas_assignment_id": canvas_assignment_id,
+                        "assignment": assignment,
+                        "existing": existing,
+                        "title": title,
+                        "description": description,
+                        "due_at": due_at,
+                        "final_status": final_status,
+                        "workflow_state": workflow_state,
+                        "embed_index": embed_index,
+                    })
+
+                # ---- Pass 2: one batched forward pass, then upsert everything ----
+                # embed_texts blocks on model inference, so run it in a worker
+                # thread to keep the event loop serving other requests
+                embeddings = (
+                    await asyncio.to_thread(embed_texts, texts_to_embed)
+                    if texts_to_embed else []
+                )
+
+                upsert_ops = []
+                for item in pending:
+                    existing = item["existing"]
+
+                    embedding_vec = []
+                    if item["embed_index"] is not None:
+                        embedding_vec = embeddings[item["embed_index"]]
                         if embedding_vec:
-                            assignments_embedded += 1
+                            course_assignments_embedded += 1
                     elif existing and existing.get("embedding"):
                         embedding_vec = existing["embedding"]  # keep prior
 
                     # Upsert assignment with embedding
+                    assignment = item["assignment"]
                     update_fields = {
-                        "canvas_id": canvas_assignment_id,
+                        "canvas_id": item["canvas_assignment_id"],
                         "user_id": db_user_id,
-                        "title": title,
-                        "description": description,
+                        "title": item["title"],
+                        "description": item["description"],
                         "course": course.get("course_code", ""),
                         "course_id": course_id,
-                        "due_date": due_at,  # (optionally convert to datetime earlier)
+                        "due_date": item["due_at"],  # (optionally convert to datetime earlier)
                         "points_possible": assignment.get("points_possible"),
                         "submission_types": assignment.get("submission_types", []),
-                        "status": final_status,
-                        "canvas_workflow_state": workflow_state,
-                        "synced_at": datetime.utcnow(),
+                        "status": item["final_status"],
+                        "canvas_workflow_state": item["workflow_state"],
+                        "canvas_updated_at": assignment.get("updated_at"),
+                        "synced_at": sync_now,
                         "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
                     }
                     if embedding_vec:
                         update_fields["embedding"] = embedding_vec
 
-                    await db.assignments.update_one(
-                        {"canvas_id": canvas_assignment_id, "user_id": db_user_id},
-                        {"$set": update_fields, "$setOnInsert": {"created_at": datetime.utcnow()}},
+                    upsert_ops.append(UpdateOne(
+                        {"canvas_id": item["canvas_assignment_id"], "user_id": db_user_id},
+                        {"$set": update_fields, "$setOnInsert": {"created_at": sync_now}},
                         upsert=True
-                    )
-                    assignments_synced += 1
+                    ))
+                    course_assignments_synced += 1
 
-        return CanvasSyncResponse(
-            success=True,
-            message=f"Successfully synced {courses_synced} courses and {assignments_synced} assignments "
-                    f"({assignments_embedded} embedded)",
-            courses_synced=courses_synced,
-            assignments_synced=assignments_synced
-        )
+                # One wire message per course instead of one per assignment;
+                # unordered so the server can apply them in parallel
+                if upsert_ops:
+                    await db.assignments.bulk_write(upsert_ops, ordered=False)
+
+                return 1, course_assignments_synced, course_assignments_embedded
+
+            results = await asyncio.gather(
+                *[sync_one_course(course) for course in courses
+                  if str(course["id"]) in tracked_course_ids],
+                return_exceptions=True
+            )
+
+            courses_synced = 0
+            assignments_synced = 0
+            assignments_embedded = 0
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"Warning: course sync failed: {result}")
+                    continue
+                courses_synced += result[0]
+                assignments_synced += result[1]
+                assignments_embedded += result[2]
+
+            return CanvasSyncResponse(
+                success=True,
+                message=f"Successfully synced {courses_synced} courses and {assignments_synced} assignments "
+                        f"({assignments_embedded} embedded)",
+                courses_synced=courses_synced,
+                assignments_synced=assignments_synced
+            )
 
     except HTTPException:
         raise
@@ -828,11 +993,12 @@ async def sync_canvas_calendar(
             calendar_event = map_canvas_event_to_calendar_event(canvas_event, db_user_id)
             events_to_sync.append(calendar_event)
             
-        # Sync events to database
-        events_synced = 0
-        for event in events_to_sync:
-            # Use canvas_id as a unique identifier to avoid duplicates
-            await db.calendar_events.update_one(
+        # Sync events to database in one unordered bulk write — a single
+        # wire message instead of one round-trip per event. canvas_id keeps
+        # the upserts duplicate-free. One timestamp covers the whole batch.
+        sync_now = datetime.utcnow()
+        event_ops = [
+            UpdateOne(
                 {
                     "canvas_id": event["canvas_id"],
                     "user_id": db_user_id
@@ -840,12 +1006,18 @@ async def sync_canvas_calendar(
                 {
                     "$set": event,
                     "$setOnInsert": {
-                        "created_at": datetime.utcnow()
+                        "created_at": sync_now
                     }
                 },
                 upsert=True
             )
-            events_synced += 1
+            for event in events_to_sync
+        ]
+
+        events_synced = 0
+        if event_ops:
+            await db.calendar_events.bulk_write(event_ops, ordered=False)
+            events_synced = len(event_ops)
             
         return CanvasCalendarSyncResponse(
             success=True,
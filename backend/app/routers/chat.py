@@ -15,7 +15,7 @@ from typing import List, Optional
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
 from app.agents import get_study_assistant, create_vector_agent
-from app.util.embed import EmbeddingService
+from app.util.embed import get_embedding_service
 from app.models.schemas import (
     ChatSessionCreate,
     ChatSessionResponse,
@@ -80,7 +80,7 @@ async def create_chat_session(
         # Process initial message if provided
         if session_request.initial_message:
             # Get vector agent and study assistant
-            embedding_service = EmbeddingService()
+            embedding_service = get_embedding_service()
             vector_agent = create_vector_agent(db, embedding_service)
             assistant = get_study_assistant()
 
@@ -206,7 +206,7 @@ async def send_message(
             })
 
         # Get vector agent and study assistant
-        embedding_service = EmbeddingService()
+        embedding_service = get_embedding_service()
         vector_agent = create_vector_agent(db, embedding_service)
         assistant = get_study_assistant()
 
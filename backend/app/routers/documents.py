@@ -8,10 +8,11 @@ from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File,
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
+import asyncio
 
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
-from app.util.embed import EmbeddingService
+from app.util.embed import get_embedding_service
 from app.services.document_processor import get_document_processor
 from app.services.chunking_service import get_chunking_service
 from app.models.schemas import (
@@ -96,9 +97,10 @@ async def upload_document(
             file.content_type
         )
 
-        # Chunk the text
+        # Chunk the text (CPU-bound, so keep it off the event loop)
         chunking_service = get_chunking_service(chunk_size=512, chunk_overlap=50)
-        chunks = chunking_service.chunk_text(
+        chunks = await asyncio.to_thread(
+            chunking_service.chunk_text,
             processed_doc["text"],
             metadata={
                 "filename": file.filename,
@@ -115,7 +117,7 @@ async def upload_document(
             )
 
         # Generate embeddings
-        embedding_service = EmbeddingService()
+        embedding_service = get_embedding_service()
 
         # Store main document record
         document_record = {
@@ -135,29 +137,32 @@ async def upload_document(
         doc_result = await db.documents.insert_one(document_record)
         document_id = str(doc_result.inserted_id)
 
-        # Store chunks with embeddings
-        chunks_to_insert = []
-        for chunk in chunks:
-            # Generate embedding for this chunk
-            embedding = await embedding_service.generate_embedding(chunk["text"])
-
-            chunk_doc = {
-                "user_id": db_user_id,  # CRITICAL: User isolation
-                "document_id": document_id,
-                "course_id": course_id,
-                "filename": file.filename,
-                "chunk_index": chunk["chunk_index"],
-                "text": chunk["text"],
-                "char_count": chunk["char_count"],
-                "embedding": embedding,
-                "page_number": chunk["metadata"].get("page"),
-                "created_at": datetime.utcnow(),
-                "metadata": chunk["metadata"]
-            }
-            chunks_to_insert.append(chunk_doc)
+        # Store chunks with embeddings in bounded batches so peak memory
+        # stays flat no matter how large the document is
+        EMBED_BATCH_SIZE = 64
+        for batch_start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[batch_start:batch_start + EMBED_BATCH_SIZE]
+            embeddings = await embedding_service.generate_embeddings_batch(
+                [chunk["text"] for chunk in batch]
+            )
 
-        if chunks_to_insert:
-            await db.document_chunks.insert_many(chunks_to_insert)
+            batch_docs = [
+                {
+                    "user_id": db_user_id,  # CRITICAL: User isolation
+                    "document_id": document_id,
+                    "course_id": course_id,
+                    "filename": file.filename,
+                    "chunk_index": chunk["chunk_index"],
+                    "text": chunk["text"],
+                    "char_count": chunk["char_count"],
+                    "embedding": embedding,
+                    "page_number": chunk["metadata"].get("page"),
+                    "created_at": datetime.utcnow(),
+                    "metadata": chunk["metadata"]
+                }
+                for chunk, embedding in zip(batch, embeddings)
+            ]
+            await db.document_chunks.insert_many(batch_docs)
 
         return DocumentUploadResponse(
             id=document_id,
@@ -220,9 +225,8 @@ async def list_documents(
         if course_id:
             query["course_id"] = course_id
 
-        # Fetch documents
+        # Fetch documents, building responses as docs stream in
         cursor = db.documents.find(query).sort("uploaded_at", -1)
-        documents = await cursor.to_list(length=None)
 
         return [
             DocumentListResponse(
@@ -235,7 +239,7 @@ async def list_documents(
                 pages=doc["pages"],
                 uploaded_at=doc["uploaded_at"]
             )
-            for doc in documents
+            async for doc in cursor
         ]
 
     except HTTPException:
@@ -282,11 +286,14 @@ async def search_documents(
         db_user_id = str(user_doc["_id"])
 
         # Generate embedding for query
-        embedding_service = EmbeddingService()
+        embedding_service = get_embedding_service()
         query_embedding = await embedding_service.generate_embedding(search_request.query)
 
         # Build vector search pipeline
-        # CRITICAL: ALWAYS filter by user_id to prevent data leakage
+        # CRITICAL: ALWAYS filter by user_id to prevent data leakage.
+        # The filter sits inside $vectorSearch so the HNSW search itself is
+        # restricted to this user's chunks — a post-$match would discard
+        # candidates after the fact and could return fewer than `limit` hits.
         match_filter = {"user_id": db_user_id}
 
         if search_request.course_id:
@@ -298,13 +305,11 @@ async def search_documents(
                     "index": "vector_search_index",  # Must be created in MongoDB Atlas
                     "path": "embedding",
                     "queryVector": query_embedding,
-                    "numCandidates": 100,
-                    "limit": search_request.limit
+                    "numCandidates": max(100, search_request.limit * 15),
+                    "limit": search_request.limit,
+                    "filter": match_filter  # User isolation filter
                 }
             },
-            {
-                "$match": match_filter  # User isolation filter
-            },
             {
                 "$project": {
                     "_id": 1,
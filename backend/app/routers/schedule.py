@@ -4,11 +4,14 @@ AI-powered schedule generation routes
 from fastapi import APIRouter, HTTPException, Depends, status
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument
 from typing import List, Optional
 
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
+from app.util.dates import parse_iso_datetime
 from app.agents import get_schedule_maker_agent
+from app.models.types import FastISODateTime
 from app.models.schemas import (
     ScheduleGenerationRequest,
     ScheduleGenerationResponse,
@@ -185,9 +188,9 @@ async def generate_schedule(
             start_time = event.get("start_time")
             end_time = event.get("end_time")
             if isinstance(start_time, str):
-                start_time = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+                start_time = parse_iso_datetime(start_time)
             if isinstance(end_time, str):
-                end_time = datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+                end_time = parse_iso_datetime(end_time)
 
             event_doc = {
                 "user_id": db_user_id,
@@ -236,8 +239,8 @@ async def generate_schedule(
 
 @router.get("/ai-blocks")
 async def get_ai_generated_blocks(
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
+    start_date: Optional[FastISODateTime] = None,
+    end_date: Optional[FastISODateTime] = None,
     user=Depends(verify_backend_token),
     db=Depends(get_database)
 ):
@@ -307,8 +310,8 @@ async def get_ai_generated_blocks(
 
 @router.delete("/ai-blocks/clear")
 async def clear_ai_blocks(
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
+    start_date: Optional[FastISODateTime] = None,
+    end_date: Optional[FastISODateTime] = None,
     user=Depends(verify_backend_token),
     db=Depends(get_database)
 ):
@@ -393,22 +396,25 @@ async def toggle_block_lock(
 
         db_user_id = str(user_doc["_id"])
 
-        # Update the lock status
-        result = await db.calendar_events.update_one(
+        # Update the lock status and read back the stored state in one round-trip
+        updated = await db.calendar_events.find_one_and_update(
             {"_id": ObjectId(block_id), "user_id": db_user_id},
-            {"$set": {"is_locked": lock, "updated_at": datetime.utcnow()}}
+            {"$set": {"is_locked": lock, "updated_at": datetime.utcnow()}},
+            projection={"_id": 0, "is_locked": 1},
+            return_document=ReturnDocument.AFTER
         )
 
-        if result.matched_count == 0:
+        if updated is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Block not found"
             )
 
+        is_locked = updated["is_locked"]
         return {
             "success": True,
-            "message": f"Block {'locked' if lock else 'unlocked'} successfully",
-            "is_locked": lock
+            "message": f"Block {'locked' if is_locked else 'unlocked'} successfully",
+            "is_locked": is_locked
         }
 
     except HTTPException:
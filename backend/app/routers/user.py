@@ -4,6 +4,7 @@ User profile management routes
 from fastapi import APIRouter, HTTPException, Depends, status
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from app.util.db import get_database
 from app.util.auth import verify_backend_token
@@ -37,24 +38,23 @@ async def get_user_profile(
         except Exception as e:
             print(f"[DEBUG] ObjectId lookup failed: {e}, trying email")
 
-        # If not found by ObjectId, try email
+        # If not found by ObjectId, upsert by email in one round trip:
+        # returns the existing profile, or creates it and returns the new
+        # doc — replaces the old find -> insert -> find sequence
         if not user_doc:
-            user_doc = await db.users.find_one({"email": email})
-            print(f"[DEBUG] Found user by email: {user_doc is not None}")
-
-        if not user_doc:
-            print(f"[DEBUG] User not found, creating new user")
-            # Create user profile if it doesn't exist
-            new_user = {
-                "email": email,
-                "name": user.get("name"),
-                "image": user.get("picture"),
-                "university": None,
-                "created_at": datetime.utcnow()
-            }
-            result = await db.users.insert_one(new_user)
-            user_doc = await db.users.find_one({"_id": result.inserted_id})
-            print(f"[DEBUG] Created new user with _id={result.inserted_id}")
+            user_doc = await db.users.find_one_and_update(
+                {"email": email},
+                {"$setOnInsert": {
+                    "email": email,
+                    "name": user.get("name"),
+                    "image": user.get("picture"),
+                    "university": None,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            print(f"[DEBUG] Upserted user by email: _id={user_doc['_id']}")
 
         return UserProfileResponse(
             id=str(user_doc["_id"]),
@@ -3,6 +3,6 @@ Services module for CampusMind backend
 Contains external API integrations and business logic services
 """
 
-from .canvas_service import CanvasService
+from .canvas_service import AsyncCanvasService, async_canvas_service
 
-__all__ = ["CanvasService"]
\ No newline at end of file
+__all__ = ["AsyncCanvasService", "async_canvas_service"]
\ No newline at end of file
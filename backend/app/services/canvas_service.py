@@ -1,315 +1,421 @@
 """
-Canvas API Service using canvasapi library
-Enhanced Canvas LMS integration with proper error handling and caching
+Canvas API Service
+Async Canvas LMS integration with pooling, rate limiting and caching
 """
-from canvasapi import Canvas
-from canvasapi.exceptions import CanvasException, InvalidAccessToken, ResourceDoesNotExist
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
 import logging
+import random
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import orjson
+
+    def _loads(content: bytes) -> Any:
+        return orjson.loads(content)
+except ImportError:
+    import json
+
+    # stdlib fallback when orjson isn't installed
+    def _loads(content: bytes) -> Any:
+        return json.loads(content)
 
 logger = logging.getLogger(__name__)
 
-class CanvasService:
-    """Canvas API service wrapper using canvasapi library"""
-    
-    def __init__(self, base_url: str, access_token: str):
+
+class _TokenBucket:
+    """Minimal async token bucket: `rate` requests/sec with `burst` headroom"""
+
+    def __init__(self, rate: float = 10.0, burst: int = 20):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCanvasService:
+    """
+    Async HTTP layer for the Canvas REST API.
+
+    Owns a single long-lived httpx.AsyncClient so every Canvas request in the
+    process shares one connection pool instead of paying a fresh TCP+TLS
+    handshake per call. The client is created lazily on first use and closed
+    from the FastAPI lifespan shutdown hook.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        # Pending GETs keyed by (method, url, params, token, paginate) so
+        # identical concurrent requests share one round-trip
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        # One rate-limit bucket per Canvas host
+        self._buckets: Dict[str, _TokenBucket] = {}
+        # Cap fan-out per user (keyed by token) so one user's gather burst
+        # can't trip Canvas's per-token throttle
+        self._user_sems: Dict[str, asyncio.Semaphore] = {}
+        # ETag cache for GET pages: key -> (etag, parsed body, next page url).
+        # A 304 revalidation skips the response body entirely on the wire.
+        self._etag_cache: Dict[tuple, tuple] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get (or lazily create) the shared pooled client"""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            try:
+                # HTTP/2 multiplexes concurrent requests over one TLS session;
+                # needs the optional h2 extra (httpx[http2])
+                transport = httpx.AsyncHTTPTransport(retries=2, http2=True, limits=limits)
+            except ImportError:
+                # retries=2 still recycles connections on transient resets
+                transport = httpx.AsyncHTTPTransport(retries=2, limits=limits)
+            self._client = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared client (wired into app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        access_token: str,
+        base_url: str,
+        params: Optional[Dict[str, Any]] = None,
+        paginate: bool = False
+    ) -> Any:
         """
-        Initialize Canvas service
-        
+        Issue a Canvas API request on the shared client.
+
         Args:
-            base_url: Canvas instance URL (e.g., https://your-school.instructure.com)
+            method: HTTP method ("GET", "POST", ...)
+            endpoint: API path relative to /api/v1 (e.g. "courses")
             access_token: Canvas Personal Access Token
-        """
-        self.base_url = base_url.rstrip('/')
-        self.access_token = access_token
-        
-        try:
-            self.canvas = Canvas(self.base_url, access_token)
-            # Test the connection by getting current user
-            self.current_user = self.canvas.get_current_user()
-            logger.info(f"Canvas service initialized for user: {self.current_user.name}")
-        except InvalidAccessToken:
-            raise ValueError("Invalid Canvas access token")
-        except CanvasException as e:
-            raise ValueError(f"Canvas API error: {str(e)}")
-    
-    def get_user_info(self) -> Dict[str, Any]:
-        """Get current user information"""
-        try:
-            user = self.canvas.get_current_user()
-            return {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "avatar_url": getattr(user, 'avatar_url', None),
-                "time_zone": getattr(user, 'time_zone', None)
-            }
-        except CanvasException as e:
-            logger.error(f"Error getting user info: {str(e)}")
-            raise
-    
-    def get_courses(self, enrollment_state: str = "active", per_page: int = 100) -> List[Dict[str, Any]]:
-        """
-        Get user's courses from Canvas
-        
-        Args:
-            enrollment_state: Filter by enrollment state ('active', 'invited', etc.)
-            per_page: Number of courses per page (max 100)
-            
+            base_url: Canvas instance URL
+            params: Optional query parameters
+            paginate: When True and the body is a list, follow the Link
+                header's rel="next" pages and concatenate all results
+
         Returns:
-            List of course dictionaries
+            Parsed JSON response body
+
+        Raises:
+            httpx.HTTPStatusError: on non-2xx responses
         """
-        try:
-            courses = self.canvas.get_courses(
-                enrollment_state=enrollment_state,
-                per_page=per_page
+        if method.upper() != "GET":
+            return await self._request(method, endpoint, access_token, base_url, params, paginate)
+
+        # Coalesce identical concurrent GETs: callers issued while an equal
+        # request is still in flight await the same task and share its result
+        key = (
+            method.upper(),
+            base_url,
+            endpoint,
+            tuple(sorted(
+                (k, tuple(v) if isinstance(v, list) else v)
+                for k, v in (params or {}).items()
+            )),
+            access_token,
+            paginate,
+        )
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._request(method, endpoint, access_token, base_url, params, paginate)
             )
-            
-            course_list = []
-            for course in courses:
-                course_data = {
-                    "id": course.id,
-                    "name": course.name,
-                    "course_code": course.course_code,
-                    "enrollment_term_id": course.enrollment_term_id,
-                    "start_at": course.start_at if course.start_at else None,
-                    "end_at": course.end_at if course.end_at else None,
-                    "workflow_state": course.workflow_state,
-                    "public_syllabus": getattr(course, 'public_syllabus', False),
-                    "public_description": getattr(course, 'public_description', None),
-                    "syllabus_body": getattr(course, 'syllabus_body', None),
-                    "total_students": getattr(course, 'total_students', 0)
-                }
-                course_list.append(course_data)
-                
-            logger.info(f"Retrieved {len(course_list)} courses")
-            return course_list
-            
-        except CanvasException as e:
-            logger.error(f"Error getting courses: {str(e)}")
-            raise
-    
-    def get_course_assignments(self, course_id: int, per_page: int = 100) -> List[Dict[str, Any]]:
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await task
+
+    MAX_RETRIES = 3
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, Any]] = None
+    ) -> httpx.Response:
         """
-        Get assignments for a specific course
-        
-        Args:
-            course_id: Canvas course ID
-            per_page: Number of assignments per page (max 100)
-            
-        Returns:
-            List of assignment dictionaries with submission status
+        Send one request through the per-host rate limiter.
+
+        429 and 5xx responses on GETs are retried with exponential backoff,
+        honoring Retry-After when Canvas sends one.
         """
-        try:
-            course = self.canvas.get_course(course_id)
-            assignments = course.get_assignments(per_page=per_page)
-            
-            assignment_list = []
-            for assignment in assignments:
-                # Get submission for current user
-                submission = None
-                try:
-                    submission = assignment.get_submission(self.current_user)
-                except ResourceDoesNotExist:
-                    # No submission exists yet
-                    pass
-                except CanvasException as e:
-                    logger.warning(f"Could not get submission for assignment {assignment.id}: {str(e)}")
-                
-                assignment_data = {
-                    "id": assignment.id,
-                    "name": assignment.name,
-                    "description": assignment.description,
-                    "due_at": assignment.due_at if assignment.due_at else None,
-                    "points_possible": assignment.points_possible,
-                    "submission_types": assignment.submission_types,
-                    "workflow_state": assignment.workflow_state,
-                    "published": assignment.published,
-                    "html_url": assignment.html_url,
-                    "course_id": course_id,
-                    "submission": {
-                        "id": submission.id if submission else None,
-                        "workflow_state": submission.workflow_state if submission else "unsubmitted",
-                        "submitted_at": submission.submitted_at if submission and submission.submitted_at else None,
-                        "score": getattr(submission, 'score', None) if submission else None,
-                        "grade": getattr(submission, 'grade', None) if submission else None
-                    } if submission else {
-                        "id": None,
-                        "workflow_state": "unsubmitted",
-                        "submitted_at": None,
-                        "score": None,
-                        "grade": None
-                    }
-                }
-                assignment_list.append(assignment_data)
-                
-            logger.info(f"Retrieved {len(assignment_list)} assignments for course {course_id}")
-            return assignment_list
-            
-        except ResourceDoesNotExist:
-            logger.error(f"Course {course_id} not found or not accessible")
-            raise ValueError(f"Course {course_id} not found or not accessible")
-        except CanvasException as e:
-            logger.error(f"Error getting assignments for course {course_id}: {str(e)}")
-            raise
-    
-    def get_calendar_events(self, 
-                          context_codes: Optional[List[str]] = None,
-                          start_date: Optional[datetime] = None,
-                          end_date: Optional[datetime] = None,
-                          per_page: int = 100) -> List[Dict[str, Any]]:
+        client = self._get_client()
+        bucket = self._buckets.setdefault(urlsplit(url).netloc, _TokenBucket())
+        sem = self._user_sems.setdefault(headers.get("Authorization", ""), asyncio.Semaphore(8))
+        retryable = method.upper() == "GET"
+
+        async with sem:
+            for attempt in range(self.MAX_RETRIES + 1):
+                await bucket.acquire()
+                response = await client.request(method, url, headers=headers, params=params)
+                if (
+                    retryable
+                    and attempt < self.MAX_RETRIES
+                    and (response.status_code == 429 or response.status_code >= 500)
+                ):
+                    try:
+                        delay = float(response.headers.get("Retry-After", ""))
+                    except ValueError:
+                        delay = 0.5 * (2 ** attempt)
+                    await asyncio.sleep(min(delay, 30.0) + random.uniform(0, 0.25))
+                    continue
+                if response.status_code == 304:
+                    return response
+                response.raise_for_status()
+                return response
+
+    async def _fetch_page(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Any, Optional[str]]:
         """
-        Get calendar events from Canvas
-        
-        Args:
-            context_codes: List of context codes (e.g., ['course_123', 'user_self'])
-            start_date: Start date for events
-            end_date: End date for events
-            per_page: Number of events per page (max 100)
-            
-        Returns:
-            List of calendar event dictionaries
+        Fetch one page, revalidating through the ETag cache for GETs.
+
+        Returns the parsed body and the rel="next" URL (if any). On a 304 the
+        cached body and next link are reused without transferring the payload.
         """
-        try:
-            events = self.canvas.get_calendar_events(
-                context_codes=context_codes or [],
-                start_date=start_date,
-                end_date=end_date,
-                per_page=per_page,
-                all_events=True  # Include assignments, discussions, etc.
+        cache_key = None
+        cached = None
+        if method.upper() == "GET":
+            cache_key = (
+                url,
+                tuple(sorted(
+                    (k, tuple(v) if isinstance(v, list) else v)
+                    for k, v in (params or {}).items()
+                )),
+                headers.get("Authorization"),
             )
-            
-            event_list = []
-            for event in events:
-                event_data = {
-                    "id": event.id,
-                    "title": event.title,
-                    "description": event.description,
-                    "start_at": event.start_at if event.start_at else None,
-                    "end_at": event.end_at if event.end_at else None,
-                    "all_day": event.all_day,
-                    "location_name": event.location_name,
-                    "context_code": event.context_code,
-                    "context_name": getattr(event, 'context_name', None),
-                    "html_url": event.html_url,
-                    "type": "calendar"
-                }
-                
-                # Determine event type based on context
-                if hasattr(event, 'assignment') and event.assignment:
-                    event_data["type"] = "assignment"
-                    event_data["assignment"] = {
-                        "id": event.assignment.id,
-                        "name": event.assignment.name,
-                        "points_possible": event.assignment.points_possible
-                    }
-                elif hasattr(event, 'discussion_topic') and event.discussion_topic:
-                    event_data["type"] = "discussion"
-                elif hasattr(event, 'quiz') and event.quiz:
-                    event_data["type"] = "quiz"
-                
-                event_list.append(event_data)
-                
-            logger.info(f"Retrieved {len(event_list)} calendar events")
-            return event_list
-            
-        except CanvasException as e:
-            logger.error(f"Error getting calendar events: {str(e)}")
-            raise
-    
-    def get_course_by_id(self, course_id: int) -> Dict[str, Any]:
-        """Get detailed information about a specific course"""
+            cached = self._etag_cache.get(cache_key)
+            if cached:
+                headers = {**headers, "If-None-Match": cached[0]}
+
+        response = await self._send(method, url, headers, params=params)
+
+        if response.status_code == 304 and cached:
+            return cached[1], cached[2]
+
+        data = _loads(response.content)
+        next_url = response.links.get("next", {}).get("url")
+
+        etag = response.headers.get("ETag")
+        if cache_key and etag and "no-store" not in response.headers.get("Cache-Control", ""):
+            if len(self._etag_cache) >= 2048:
+                self._etag_cache.clear()
+            self._etag_cache[cache_key] = (etag, data, next_url)
+
+        return data, next_url
+
+    # Stale-while-revalidate windows for the shared Mongo cache: payloads
+    # younger than SOFT_TTL are served as-is; between SOFT and HARD they are
+    # served stale while a background task refreshes; past HARD we block on
+    # Canvas again
+    SWR_SOFT_TTL = 60
+    SWR_HARD_TTL = 600
+
+    async def _store_cache(self, db, doc_id: str, body: Any):
+        """Upsert a fetched payload into the shared canvas_cache collection"""
         try:
-            course = self.canvas.get_course(course_id)
-            return {
-                "id": course.id,
-                "name": course.name,
-                "course_code": course.course_code,
-                "enrollment_term_id": course.enrollment_term_id,
-                "start_at": course.start_at if course.start_at else None,
-                "end_at": course.end_at if course.end_at else None,
-                "workflow_state": course.workflow_state,
-                "public_syllabus": getattr(course, 'public_syllabus', False),
-                "public_description": getattr(course, 'public_description', None),
-                "syllabus_body": getattr(course, 'syllabus_body', None),
-                "total_students": getattr(course, 'total_students', 0),
-                "html_url": course.html_url
-            }
-        except ResourceDoesNotExist:
-            raise ValueError(f"Course {course_id} not found or not accessible")
-        except CanvasException as e:
-            logger.error(f"Error getting course {course_id}: {str(e)}")
-            raise
-    
-    def get_assignment_by_id(self, course_id: int, assignment_id: int) -> Dict[str, Any]:
-        """Get detailed information about a specific assignment"""
+            await db.canvas_cache.update_one(
+                {"_id": doc_id},
+                {"$set": {"body": body, "fetched_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"canvas_cache write failed: {e}")
+
+    async def _refresh_cache(self, db, doc_id: str, endpoint: str, access_token: str,
+                             base_url: str, params: Optional[Dict[str, Any]]):
+        """Background refresh for a soft-stale cache entry"""
         try:
-            course = self.canvas.get_course(course_id)
-            assignment = course.get_assignment(assignment_id)
-            
-            # Get submission for current user
-            submission = None
-            try:
-                submission = assignment.get_submission(self.current_user)
-            except ResourceDoesNotExist:
-                pass
-            except CanvasException as e:
-                logger.warning(f"Could not get submission for assignment {assignment_id}: {str(e)}")
-            
-            return {
-                "id": assignment.id,
-                "name": assignment.name,
-                "description": assignment.description,
-                "due_at": assignment.due_at if assignment.due_at else None,
-                "points_possible": assignment.points_possible,
-                "submission_types": assignment.submission_types,
-                "workflow_state": assignment.workflow_state,
-                "published": assignment.published,
-                "html_url": assignment.html_url,
-                "course_id": course_id,
-                "submission": {
-                    "id": submission.id if submission else None,
-                    "workflow_state": submission.workflow_state if submission else "unsubmitted",
-                    "submitted_at": submission.submitted_at if submission and submission.submitted_at else None,
-                    "score": getattr(submission, 'score', None) if submission else None,
-                    "grade": getattr(submission, 'grade', None) if submission else None,
-                    "body": getattr(submission, 'body', None) if submission else None
-                } if submission else {
-                    "id": None,
-                    "workflow_state": "unsubmitted",
-                    "submitted_at": None,
-                    "score": None,
-                    "grade": None,
-                    "body": None
-                }
-            }
-        except ResourceDoesNotExist:
-            raise ValueError(f"Assignment {assignment_id} not found in course {course_id}")
-        except CanvasException as e:
-            logger.error(f"Error getting assignment {assignment_id}: {str(e)}")
-            raise
-    
-    def test_connection(self) -> Dict[str, Any]:
-        """Test the Canvas API connection and return user info"""
+            body = await self._make_request(
+                "GET", endpoint, access_token, base_url, params=params, paginate=True
+            )
+            await self._store_cache(db, doc_id, body)
+        except Exception as e:
+            logger.warning(f"Background Canvas cache refresh failed for {endpoint}: {e}")
+
+    async def _swr_request(
+        self,
+        db,
+        cache_key: str,
+        endpoint: str,
+        access_token: str,
+        base_url: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Paginated GET backed by a Mongo stale-while-revalidate cache.
+
+        Unlike the in-process ETag cache, entries in canvas_cache survive
+        worker restarts and are shared across replicas, so repeat dashboard
+        loads cost one find_one instead of a Canvas round-trip.
+        """
+        key_material = f"{cache_key}:{base_url}:{endpoint}:{sorted((params or {}).items(), key=str)!r}"
+        doc_id = hashlib.sha1(key_material.encode()).hexdigest()
+
+        doc = None
         try:
-            user = self.canvas.get_current_user()
-            return {
-                "success": True,
-                "user": {
-                    "id": user.id,
-                    "name": user.name,
-                    "email": user.email
-                },
-                "canvas_url": self.base_url
-            }
-        except CanvasException as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
-    
-    @staticmethod
-    def create_context_codes(course_ids: List[int]) -> List[str]:
-        """Create context codes for Canvas API calls"""
-        return [f"course_{course_id}" for course_id in course_ids] + ["user_self"]
+            doc = await db.canvas_cache.find_one({"_id": doc_id})
+        except Exception as e:
+            logger.warning(f"canvas_cache read failed: {e}")
+
+        if doc:
+            age = (datetime.utcnow() - doc["fetched_at"]).total_seconds()
+            if age < self.SWR_SOFT_TTL:
+                return doc["body"]
+            if age < self.SWR_HARD_TTL:
+                # Serve stale immediately, refresh off the request path
+                asyncio.create_task(
+                    self._refresh_cache(db, doc_id, endpoint, access_token, base_url, params)
+                )
+                return doc["body"]
+
+        body = await self._make_request(
+            "GET", endpoint, access_token, base_url, params=params, paginate=True
+        )
+        await self._store_cache(db, doc_id, body)
+        return body
+
+    async def get_courses(
+        self,
+        access_token: str,
+        base_url: str,
+        enrollment_state: str = "active",
+        db=None,
+        cache_key: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the user's courses across all pages (SWR-cached when db given)"""
+        params = {"enrollment_state": enrollment_state, "per_page": 100}
+        if db is not None and cache_key is not None:
+            return await self._swr_request(db, cache_key, "courses", access_token, base_url, params)
+        return await self._make_request(
+            "GET", "courses", access_token, base_url,
+            params=params, paginate=True
+        )
+
+    async def get_course_assignments(
+        self,
+        course_id: str,
+        access_token: str,
+        base_url: str,
+        include_submission: bool = True,
+        bucket: Optional[str] = None,
+        order_by: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a course's assignments across all pages.
+
+        include_submission=True asks Canvas to embed each assignment's full
+        submission record, which roughly doubles payload size; pass False on
+        paths that only read name/due date metadata.
+
+        bucket/order_by are forwarded to Canvas so filtering (e.g.
+        bucket="upcoming") and sorting happen server-side instead of
+        shipping every assignment back just to discard most of them.
+        """
+        params: Dict[str, Any] = {"per_page": 100}
+        if include_submission:
+            params["include[]"] = "submission"
+        if bucket:
+            params["bucket"] = bucket
+        if order_by:
+            params["order_by"] = order_by
+        return await self._make_request(
+            "GET", f"courses/{course_id}/assignments", access_token, base_url,
+            params=params, paginate=True
+        )
+
+    async def paginate(
+        self,
+        endpoint: str,
+        access_token: str,
+        base_url: str,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Yield one parsed page at a time from a paginated Canvas GET.
+
+        Callers that filter or stream results can process each page as it
+        arrives and let it be collected, keeping peak memory at one page
+        instead of the full result set. Bypasses the in-flight coalescing
+        map (generators can't share a single consumer).
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        url = f"{base_url.rstrip('/')}/api/v1/{endpoint.lstrip('/')}"
+
+        page, next_url = await self._fetch_page("GET", url, headers, params=params)
+        yield page
+        while next_url:
+            # next_url already carries the page/per_page query string
+            page, next_url = await self._fetch_page("GET", next_url, headers)
+            yield page
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        access_token: str,
+        base_url: str,
+        params: Optional[Dict[str, Any]] = None,
+        paginate: bool = False
+    ) -> Any:
+        """Execute the HTTP request (no coalescing) and parse the body"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+        url = f"{base_url.rstrip('/')}/api/v1/{endpoint.lstrip('/')}"
+
+        data, next_url = await self._fetch_page(method, url, headers, params=params)
+
+        if not paginate or not isinstance(data, list):
+            return data
+
+        # Canvas paginates list endpoints via the Link header; walk rel="next"
+        # until exhausted so callers never silently truncate at one page
+        results = list(data)
+        while next_url:
+            # next_url already carries the page/per_page query string
+            page, next_url = await self._fetch_page(method, next_url, headers)
+            results.extend(page)
+        return results
+
+
+# Shared instance - one connection pool per process
+async_canvas_service = AsyncCanvasService()
+
+
+@lru_cache(maxsize=1024)
+def _ctx_codes(course_ids: tuple) -> tuple:
+    return tuple(f"course_{course_id}" for course_id in course_ids) + ("user_self",)
+
+
+def create_context_codes(course_ids) -> List[str]:
+    """Create context codes for Canvas API calls (memoized per course set)"""
+    return list(_ctx_codes(tuple(sorted(course_ids, key=str))))
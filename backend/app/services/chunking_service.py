@@ -1,9 +1,23 @@
 """
 Chunking Service - Smart text splitting for better embeddings and retrieval
 """
-from typing import List, Dict, Any, Optional
+from collections import deque
+from itertools import chain
+from typing import List, Dict, Any, Optional, Sequence
+import asyncio
 import re
 
+# Compiled once at import - sentence splitting runs per document ingest.
+# re2 executes as a linear-time DFA and is noticeably faster on long
+# documents; fall back to stdlib re when it isn't installed (or its build
+# rejects the lookbehind).
+_SENTENCE_PATTERN = r'(?<=[.!?])\s+'
+try:
+    import re2
+    _SENTENCE_RE = re2.compile(_SENTENCE_PATTERN)
+except Exception:
+    _SENTENCE_RE = re.compile(_SENTENCE_PATTERN)
+
 
 class ChunkingService:
     """
@@ -16,6 +30,10 @@ class ChunkingService:
     - Semantic chunking (for future enhancement)
     """
 
+    # Separator hierarchy for recursive splitting, coarsest first; built once
+    # instead of per call
+    SEPARATORS = ("\n\n", "\n", ". ", " ", "")
+
     def __init__(
         self,
         chunk_size: int = 512,
@@ -76,146 +94,197 @@ class ChunkingService:
         else:
             raise ValueError(f"Unknown chunking strategy: {strategy}")
 
-        # Add metadata and position info
+        # Splitters return (text, start, end) with offsets into the original
+        # text, so no re-scanning is needed here
         result = []
-        current_pos = 0
-
-        for idx, chunk_text in enumerate(chunks):
-            # Find position in original text
-            start_pos = text.find(chunk_text, current_pos)
-            if start_pos == -1:
-                start_pos = current_pos
-
-            end_pos = start_pos + len(chunk_text)
-            current_pos = end_pos
 
+        for idx, (chunk_text, start_pos, end_pos) in enumerate(chunks):
+            stripped = chunk_text.strip()
             result.append({
-                "text": chunk_text.strip(),
+                "text": stripped,
                 "chunk_index": idx,
                 "start_char": start_pos,
                 "end_char": end_pos,
-                "char_count": len(chunk_text.strip()),
+                "char_count": len(stripped),
                 "metadata": {**metadata}
             })
 
         return result
 
-    def _recursive_split(self, text: str) -> List[str]:
+    def _recursive_split(self, text: str) -> List[tuple]:
         """
         Recursively split text using multiple separators.
         Best for general-purpose chunking.
         """
         # Try splitting by paragraphs first
-        separators = ["\n\n", "\n", ". ", " ", ""]
-
-        return self._split_with_separators(text, separators)
+        return self._split_with_separators(text, self.SEPARATORS)
 
     def _split_with_separators(
         self,
         text: str,
-        separators: List[str]
-    ) -> List[str]:
-        """Split text using a hierarchy of separators"""
-        if not separators:
-            return [text]
-
-        separator = separators[0]
-        remaining_separators = separators[1:]
+        separators: Sequence[str],
+        base: int = 0
+    ) -> List[tuple]:
+        """
+        Split text using a hierarchy of separators.
 
-        if separator == "":
-            # Last resort: split by character
-            return self._fixed_size_split(text)
+        Returns (chunk, start, end) tuples; `base` offsets positions into the
+        original document so positions stay absolute.
 
-        splits = text.split(separator)
+        Iterative: oversized splits go back onto a work deque with the next
+        separator instead of recursing, and chunks accumulate in list buffers
+        joined once — avoids quadratic string growth on long paragraphs.
+        """
         chunks = []
-        current_chunk = ""
+        # Items are ("chunk", (text, start, end)) or
+        # ("segment", (text, sep_index, base)); sub-items are pushed back to
+        # the front so chunks come out in document order
+        work = deque([("segment", (text, 0, base))])
 
-        for split in splits:
-            if len(current_chunk) + len(split) + len(separator) < self.chunk_size:
-                current_chunk += split + separator
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
+        while work:
+            kind, item = work.popleft()
 
-                # If split is too large, recursively split it
-                if len(split) > self.chunk_size:
-                    sub_chunks = self._split_with_separators(split, remaining_separators)
-                    chunks.extend(sub_chunks)
-                    current_chunk = ""
-                else:
-                    current_chunk = split + separator
+            if kind == "chunk":
+                chunks.append(item)
+                continue
 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+            seg, sep_idx, seg_base = item
+
+            if sep_idx >= len(separators):
+                chunks.append((seg, seg_base, seg_base + len(seg)))
+                continue
+
+            separator = separators[sep_idx]
+
+            if separator == "":
+                # Last resort: split by character
+                chunks.extend(self._fixed_size_split(seg, seg_base))
+                continue
+
+            sep_len = len(separator)
+            items = []  # chunks and oversized sub-segments, in order
+            buf = []
+            buf_len = 0
+            buf_start = 0
+            pos = 0  # running offset of the current split within seg
+
+            for split in seg.split(separator):
+                if buf_len + len(split) + sep_len < self.chunk_size:
+                    if not buf:
+                        buf_start = pos
+                    buf.append(split)
+                    buf.append(separator)
+                    buf_len += len(split) + sep_len
+                else:
+                    if buf:
+                        end = min(buf_start + buf_len, len(seg))
+                        items.append(("chunk", ("".join(buf), seg_base + buf_start, seg_base + end)))
+                        buf = []
+                        buf_len = 0
+
+                    # If split is too large, re-queue it with the next separator
+                    if len(split) > self.chunk_size:
+                        items.append(("segment", (split, sep_idx + 1, seg_base + pos)))
+                    else:
+                        buf_start = pos
+                        buf = [split, separator]
+                        buf_len = len(split) + sep_len
+                pos += len(split) + sep_len
+
+            if buf:
+                end = min(buf_start + buf_len, len(seg))
+                items.append(("chunk", ("".join(buf), seg_base + buf_start, seg_base + end)))
+
+            work.extendleft(reversed(items))
 
         return chunks
 
-    def _fixed_size_split(self, text: str) -> List[str]:
+    def _fixed_size_split(self, text: str, base: int = 0) -> List[tuple]:
         """Split text into fixed-size chunks with overlap"""
+        # Window starts follow a fixed stride, so enumerate them directly
+        # (also guards against a zero/negative stride looping forever)
+        stride = max(self.chunk_size - self.chunk_overlap, 1)
+        n = len(text)
         chunks = []
-        start = 0
 
-        while start < len(text):
-            end = start + self.chunk_size
+        for start in range(0, n, stride):
+            end = min(start + self.chunk_size, n)
             chunk = text[start:end]
 
             if chunk.strip():
-                chunks.append(chunk)
-
-            start = end - self.chunk_overlap
+                chunks.append((chunk, base + start, base + end))
 
         return chunks
 
-    def _sentence_split(self, text: str) -> List[str]:
+    def _sentence_split(self, text: str) -> List[tuple]:
         """Split text by sentences, grouping into chunks"""
-        # Simple sentence splitting (can be improved with NLTK)
-        sentence_endings = re.compile(r'(?<=[.!?])\s+')
-        sentences = sentence_endings.split(text)
+        # Simple sentence splitting (can be improved with NLTK); finditer
+        # gives the boundary spans so offsets come for free
+        bounds = []
+        last = 0
+        for match in _SENTENCE_RE.finditer(text):
+            bounds.append((last, match.start()))
+            last = match.end()
+        bounds.append((last, len(text)))
 
         chunks = []
-        current_chunk = ""
+        current_start = None
+        current_end = 0
+        current_len = 0
 
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) < self.chunk_size:
-                current_chunk += sentence + " "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        for sent_start, sent_end in bounds:
+            if sent_start == sent_end:
+                continue
+            sent_len = sent_end - sent_start
+            if current_start is not None and current_len + sent_len >= self.chunk_size:
+                chunks.append((text[current_start:current_end], current_start, current_end))
+                current_start = None
+                current_len = 0
+            if current_start is None:
+                current_start = sent_start
+            current_end = sent_end
+            current_len += sent_len + 1  # +1 for the joining space
+
+        if current_start is not None:
+            chunks.append((text[current_start:current_end], current_start, current_end))
 
         return chunks
 
-    def _paragraph_split(self, text: str) -> List[str]:
+    def _paragraph_split(self, text: str) -> List[tuple]:
         """Split text by paragraphs, grouping into chunks"""
-        paragraphs = text.split("\n\n")
-
         chunks = []
         current_chunk = ""
+        current_start = 0
+        pos = 0  # running offset of the current paragraph within text
 
-        for para in paragraphs:
-            para = para.strip()
+        for raw_para in text.split("\n\n"):
+            para = raw_para.strip()
             if not para:
+                pos += len(raw_para) + 2
                 continue
 
             if len(current_chunk) + len(para) < self.chunk_size:
+                if not current_chunk:
+                    current_start = pos
                 current_chunk += para + "\n\n"
             else:
                 if current_chunk:
-                    chunks.append(current_chunk.strip())
+                    end = min(current_start + len(current_chunk), len(text))
+                    chunks.append((current_chunk, current_start, end))
 
                 # If paragraph is too large, split it further
                 if len(para) > self.chunk_size:
-                    sub_chunks = self._fixed_size_split(para)
+                    sub_chunks = self._fixed_size_split(para, pos)
                     chunks.extend(sub_chunks)
                     current_chunk = ""
                 else:
+                    current_start = pos
                     current_chunk = para + "\n\n"
+            pos += len(raw_para) + 2
 
         if current_chunk:
-            chunks.append(current_chunk.strip())
+            end = min(current_start + len(current_chunk), len(text))
+            chunks.append((current_chunk, current_start, end))
 
         return chunks
 
@@ -253,6 +322,30 @@ class ChunkingService:
 
         return all_chunks
 
+    async def chunk_documents_async(
+        self,
+        documents: List[Dict[str, Any]],
+        text_key: str = "text",
+        metadata_key: str = "metadata"
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunk multiple documents concurrently in worker threads.
+
+        Chunking is pure CPU work; running each document through
+        asyncio.to_thread keeps the event loop free and lets documents be
+        processed in parallel. Same output as chunk_documents.
+        """
+        tasks = [
+            asyncio.to_thread(
+                self.chunk_text,
+                doc.get(text_key, ""),
+                {**doc.get(metadata_key, {}), "document_index": doc_idx}
+            )
+            for doc_idx, doc in enumerate(documents)
+        ]
+        results = await asyncio.gather(*tasks)
+        return list(chain.from_iterable(results))
+
 
 # Singleton instance
 _chunking_service = None
@@ -2,10 +2,24 @@
 Document Processing Service - Extracts text from PDFs and PowerPoint files
 """
 import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import mimetypes
 
+# Matches "slide12.xml" so slides sort numerically, not lexically
+_SLIDE_NUM_RE = re.compile(r"slide(\d+)\.xml$")
+
+# Only a handful of types are supported, so resolve by suffix directly and
+# keep mimetypes as the fallback for anything unusual
+_EXT_TO_MIME = {
+    ".pdf": "application/pdf",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".ppt": "application/vnd.ms-powerpoint"
+}
+
 
 class DocumentProcessor:
     """
@@ -27,7 +41,8 @@ class DocumentProcessor:
         self,
         file_content: bytes,
         filename: str,
-        mime_type: Optional[str] = None
+        mime_type: Optional[str] = None,
+        return_full_text: bool = True
     ) -> Dict[str, Any]:
         """
         Process a document and extract text content.
@@ -36,6 +51,9 @@ class DocumentProcessor:
             file_content: Raw file bytes
             filename: Original filename
             mime_type: MIME type (auto-detected if not provided)
+            return_full_text: When False, skip joining the full document text
+                and return "text" as "" — callers that only embed the
+                per-page/slide chunks avoid a document-sized allocation
 
         Returns:
             {
@@ -52,14 +70,17 @@ class DocumentProcessor:
         """
         # Detect MIME type if not provided
         if not mime_type:
-            mime_type, _ = mimetypes.guess_type(filename)
+            ext = os.path.splitext(filename)[1].lower()
+            mime_type = _EXT_TO_MIME.get(ext)
+            if not mime_type:
+                mime_type, _ = mimetypes.guess_type(filename)
 
         if not mime_type or mime_type not in self.supported_types:
             raise ValueError(f"Unsupported file type: {mime_type}. Supported: PDF, PPTX")
 
         # Process based on file type
         processor = self.supported_types[mime_type]
-        result = await processor(file_content, filename)
+        result = await processor(file_content, filename, return_full_text=return_full_text)
 
         return {
             "text": result["text"],
@@ -74,7 +95,12 @@ class DocumentProcessor:
             "chunks": result.get("chunks", [result["text"]])
         }
 
-    async def _process_pdf(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def _process_pdf(
+        self,
+        file_content: bytes,
+        filename: str,
+        return_full_text: bool = True
+    ) -> Dict[str, Any]:
         """Extract text from PDF using PyMuPDF (fitz)"""
         try:
             import fitz  # PyMuPDF
@@ -84,14 +110,23 @@ class DocumentProcessor:
         try:
             # Open PDF from bytes
             pdf_doc = fitz.open(stream=file_content, filetype="pdf")
+            page_count = len(pdf_doc)
+
+            # get_text releases the GIL, so large PDFs extract pages across
+            # threads; small docs stay serial where thread overhead dominates
+            if page_count >= 8:
+                workers = min(os.cpu_count() or 1, page_count)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    page_texts = list(
+                        executor.map(lambda i: pdf_doc[i].get_text(), range(page_count))
+                    )
+            else:
+                page_texts = [pdf_doc[i].get_text() for i in range(page_count)]
 
             text_content = []
             chunks = []  # Store text by page for better chunking
 
-            for page_num in range(len(pdf_doc)):
-                page = pdf_doc[page_num]
-                page_text = page.get_text()
-
+            for page_num, page_text in enumerate(page_texts):
                 if page_text.strip():
                     text_content.append(page_text)
                     chunks.append({
@@ -102,21 +137,103 @@ class DocumentProcessor:
 
             pdf_doc.close()
 
-            full_text = "\n\n".join(text_content)
+            full_text = "\n\n".join(text_content) if return_full_text else ""
 
             return {
                 "text": full_text,
-                "pages": len(pdf_doc),
+                "pages": page_count,
                 "chunks": [chunk["text"] for chunk in chunks],
                 "extra_metadata": {
-                    "total_pages": len(pdf_doc)
+                    "total_pages": page_count
                 }
             }
 
         except Exception as e:
             raise Exception(f"Failed to process PDF: {str(e)}")
 
-    async def _process_pptx(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def _process_pptx(
+        self,
+        file_content: bytes,
+        filename: str,
+        return_full_text: bool = True
+    ) -> Dict[str, Any]:
+        """Extract text from PowerPoint (PPTX)"""
+        try:
+            # Fast path: read the slide XML straight out of the zip package
+            return self._extract_pptx_xml(file_content, return_full_text=return_full_text)
+        except Exception:
+            # Odd packages fall back to the python-pptx object model
+            return await self._process_pptx_fallback(
+                file_content, filename, return_full_text=return_full_text
+            )
+
+    def _extract_pptx_xml(
+        self,
+        file_content: bytes,
+        return_full_text: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Extract PPTX text by parsing slide XML directly with lxml.
+
+        A PPTX is a zip of XML parts; pulling the a:t text runs via XPath
+        skips python-pptx's per-shape object model and does the extraction
+        in libxml2 C code.
+        """
+        import zipfile
+        import lxml.etree as ET
+
+        ns = {"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+
+        with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+            names = set(archive.namelist())
+            slide_names = sorted(
+                (
+                    name for name in names
+                    if name.startswith("ppt/slides/slide") and name.endswith(".xml")
+                ),
+                key=lambda name: int(_SLIDE_NUM_RE.search(name).group(1))
+            )
+
+            text_content = []
+            chunks = []
+
+            for name in slide_names:
+                slide_num = int(_SLIDE_NUM_RE.search(name).group(1))
+                root = ET.fromstring(archive.read(name))
+
+                slide_text = []
+                runs = root.xpath("//a:t/text()", namespaces=ns)
+                if runs:
+                    slide_text.append(" ".join(runs))
+
+                # Notes live in a sibling part with the same slide number
+                notes_name = f"ppt/notesSlides/notesSlide{slide_num}.xml"
+                if notes_name in names:
+                    notes_root = ET.fromstring(archive.read(notes_name))
+                    notes = " ".join(notes_root.xpath("//a:t/text()", namespaces=ns)).strip()
+                    if notes:
+                        slide_text.append(f"[Notes: {notes}]")
+
+                slide_content = "\n".join(slide_text)
+                if slide_content.strip():
+                    text_content.append(f"Slide {slide_num}:\n{slide_content}")
+                    chunks.append(slide_content)
+
+        return {
+            "text": "\n\n".join(text_content) if return_full_text else "",
+            "pages": len(slide_names),
+            "chunks": chunks,
+            "extra_metadata": {
+                "total_slides": len(slide_names)
+            }
+        }
+
+    async def _process_pptx_fallback(
+        self,
+        file_content: bytes,
+        filename: str,
+        return_full_text: bool = True
+    ) -> Dict[str, Any]:
         """Extract text from PowerPoint (PPTX) using python-pptx"""
         try:
             from pptx import Presentation
@@ -134,15 +251,19 @@ class DocumentProcessor:
             for slide_num, slide in enumerate(presentation.slides):
                 slide_text = []
 
-                # Extract text from shapes
+                # Extract text from shapes; has_text_frame is a cheap flag,
+                # unlike hasattr(shape, "text") which resolves the descriptor
                 for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text:
-                        slide_text.append(shape.text)
+                    if not shape.has_text_frame:
+                        continue
+                    shape_text = shape.text_frame.text
+                    if shape_text:
+                        slide_text.append(shape_text)
 
                 # Extract notes if available
                 if slide.has_notes_slide:
-                    notes = slide.notes_slide.notes_text_frame.text
-                    if notes.strip():
+                    notes = slide.notes_slide.notes_text_frame.text.strip()
+                    if notes:
                         slide_text.append(f"[Notes: {notes}]")
 
                 slide_content = "\n".join(slide_text)
@@ -154,7 +275,7 @@ class DocumentProcessor:
                         "type": "slide"
                     })
 
-            full_text = "\n\n".join(text_content)
+            full_text = "\n\n".join(text_content) if return_full_text else ""
 
             return {
                 "text": full_text,
@@ -168,7 +289,12 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Failed to process PPTX: {str(e)}")
 
-    async def _process_ppt(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    async def _process_ppt(
+        self,
+        file_content: bytes,
+        filename: str,
+        return_full_text: bool = True
+    ) -> Dict[str, Any]:
         """
         Process legacy PPT files.
         For now, returns an error - would need LibreOffice or Apache Tika.
@@ -1,12 +1,35 @@
 # app/services/embedder.py
-from sentence_transformers import SentenceTransformer
 from functools import lru_cache
 from typing import List
 
 @lru_cache(maxsize=1)
 def _model():
+    # torch + sentence_transformers are the heaviest imports in the app
+    # (seconds of cold-start, large baseline RSS); defer them to first use
+    # so merely importing the router chain stays cheap
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if torch.cuda.is_available():
+        # FP16 on GPU: MiniLM fits trivially and half precision roughly
+        # doubles encode throughput
+        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2", device="cuda")  # 384 dims
+        model.half()
+        return model
     return SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")  # 384 dims
 
+def embed_texts(texts: List[str], batch_size: int = 64) -> List[List[float]]:
+    """Embed many texts in one padded forward pass per batch (cosine-friendly)"""
+    if not texts:
+        return []
+    vectors = _model().encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+    return vectors.tolist()
+
 def embed_text(text: str) -> List[float]:
-    v = _model().encode([text], normalize_embeddings=True)  # cosine-friendly
-    return v[0].tolist()
+    return embed_texts([text])[0]
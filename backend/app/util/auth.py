@@ -1,10 +1,15 @@
 """
 Authentication utilities for CampusMind API
 """
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt, JWTError
+import jwt
+from jwt import InvalidTokenError as JWTError
 
 SECRET = os.environ.get("BACKEND_JWT_SECRET", "dev-secret")
 ALGS = ["HS256"]
@@ -13,9 +18,28 @@ AUD = "fastapi"
 
 security = HTTPBearer()
 
+# Verified-token cache: the same client sends the same bearer token on every
+# request, so skip the HMAC + claim checks on repeats. Keyed by a token hash
+# (never the raw token) and gated on the exp claim; lock because FastAPI may
+# run sync dependencies in the threadpool.
+_TOKEN_CACHE_MAX = 4096
+_token_cache = OrderedDict()  # blake2b(token) -> payload, LRU order
+_token_cache_lock = threading.Lock()
+
 def verify_backend_token(creds: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token from Next.js frontend"""
     token = creds.credentials
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit is not None:
+            if hit.get("exp", 0) > time.time():
+                _token_cache.move_to_end(key)
+                return hit
+            # Expired entries are dead weight; drop them on sight
+            _token_cache.pop(key, None)
+
     try:
         payload = jwt.decode(
             token,
@@ -27,4 +51,12 @@ def verify_backend_token(creds: HTTPAuthorizationCredentials = Depends(security)
     except JWTError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    # Only cache successful verifications; evict least-recently-used when
+    # full instead of dumping the whole cache
+    with _token_cache_lock:
+        _token_cache[key] = payload
+        _token_cache.move_to_end(key)
+        if len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+
     return payload  # contains sub, email, name, picture, iat, exp, iss, aud
@@ -0,0 +1,61 @@
+"""
+Cosine kernels for hot in-process ranking loops.
+
+Uses Numba-jitted tight loops (no temporaries, auto-vectorized) when numba
+is installed, otherwise falls back to plain NumPy so the call sites don't
+have to care.
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True)
+    def cosine(a, b):
+        """Cosine similarity of two 1-D float arrays"""
+        s = 0.0
+        na = 0.0
+        nb = 0.0
+        for i in range(a.shape[0]):
+            s += a[i] * b[i]
+            na += a[i] * a[i]
+            nb += b[i] * b[i]
+        denom = math.sqrt(na * nb)
+        if denom == 0.0:
+            return 0.0
+        return s / denom
+
+    @njit(fastmath=True, cache=True, parallel=True)
+    def cosine_matrix(query, matrix, out):
+        """Cosine of `query` against every row of `matrix`, written into `out`"""
+        for row in prange(matrix.shape[0]):
+            out[row] = cosine(matrix[row], query)
+else:
+    def cosine(a, b):
+        """Cosine similarity of two 1-D float arrays"""
+        denom = math.sqrt(float(np.vdot(a, a)) * float(np.vdot(b, b)))
+        if denom == 0.0:
+            return 0.0
+        return float(np.dot(a, b) / denom)
+
+    def cosine_matrix(query, matrix, out):
+        """Cosine of `query` against every row of `matrix`, written into `out`"""
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        norms[norms == 0.0] = 1.0
+        out[:] = (matrix @ query) / norms
+
+
+def warm():
+    """Compile the jitted kernels so the first request doesn't pay for it"""
+    a = np.ones(8, dtype=np.float32)
+    m = np.ones((2, 8), dtype=np.float32)
+    out = np.empty(2, dtype=np.float32)
+    cosine(a, a)
+    cosine_matrix(a, m, out)
@@ -0,0 +1,28 @@
+"""
+Date parsing utilities for CampusMind
+"""
+from datetime import datetime
+
+try:
+    import ciso8601
+
+    def parse_iso_datetime(value: str) -> datetime:
+        """Parse an ISO-8601 string with the C-level ciso8601 parser"""
+        return ciso8601.parse_datetime(value)
+
+except ImportError:
+    import sys
+
+    if sys.version_info >= (3, 11):
+        # 3.11's C-implemented fromisoformat accepts the trailing "Z"
+        # directly, so skip the per-call string rewrite
+        def parse_iso_datetime(value: str) -> datetime:
+            """Parse an ISO-8601 string with the stdlib parser"""
+            return datetime.fromisoformat(value)
+
+    else:
+        # Older stdlib parsers need the explicit offset form, hence the
+        # replace (two string allocations per call)
+        def parse_iso_datetime(value: str) -> datetime:
+            """Parse an ISO-8601 string with the stdlib parser"""
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
@@ -1,11 +1,13 @@
 """
 Database connection and utilities for CampusMind
 """
+import logging
 import os
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import MongoClient
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 class DatabaseManager:
     """Manages database connections and operations"""
     
@@ -21,17 +23,28 @@ class DatabaseManager:
             
             if not mongodb_uri:
                 raise ValueError("MONGODB_URI environment variable is required")
-            
-            self.client = AsyncIOMotorClient(mongodb_uri)
+
+            # Explicitly size the connection pool: the motor default (maxPoolSize=100)
+            # multiplies per uvicorn worker, so keep it right-sized and reuse warm
+            # TCP+TLS sessions instead of paying handshakes under load
+            self.client = AsyncIOMotorClient(
+                mongodb_uri,
+                maxPoolSize=int(os.getenv("MONGO_POOL_SIZE", "50")),
+                minPoolSize=5,
+                maxIdleTimeMS=60_000,
+                serverSelectionTimeoutMS=3_000,
+                retryWrites=True,
+                compressors="zstd,snappy,zlib"
+            )
             self.database = self.client[db_name]
             
             # Test connection
             await self.client.admin.command('ping')
-            print(f"Connected to MongoDB Atlas database: {db_name}")
+            logger.info("Connected to MongoDB Atlas database: %s", db_name)
             
         except Exception as e:
-            print(f"Failed to connect to MongoDB: {e}")
-            print("Running in development mode without database")
+            logger.error("Failed to connect to MongoDB: %s", e)
+            logger.warning("Running in development mode without database")
             # In development, we'll continue without database for basic API testing
             self.client = None
             self.database = None
@@ -40,7 +53,7 @@ class DatabaseManager:
         """Disconnect from MongoDB"""
         if self.client is not None:
             self.client.close()
-            print("Disconnected from MongoDB")
+            logger.info("Disconnected from MongoDB")
 
     def get_database(self) -> AsyncIOMotorDatabase:
         """Get the database instance"""
@@ -54,13 +67,39 @@ class DatabaseManager:
             # MongoDB automatically creates collections on first document insert
             # We only set up essential indexes here
 
-            # User indexes - only if users collection exists
             existing_collections = await self.database.list_collection_names()
 
-            if "users" in existing_collections:
-                await self.database.users.create_index("email", unique=True)
-                print("Created indexes on users collection")
-                
+            # User indexes - every authenticated request resolves the user by
+            # email, so make this a guaranteed point lookup (create_index is
+            # idempotent and will create the collection if needed)
+            await self.database.users.create_index("email", unique=True)
+            logger.info("Created indexes on users collection")
+
+
+            # Assignment indexes - the sync path batch-resolves assignments by
+            # (user_id, canvas_id) and reads filter on due date and status;
+            # without these every sync does a collection scan per course
+            await self.database.assignments.create_index([
+                ("user_id", 1),
+                ("canvas_id", 1)
+            ], unique=True)
+            await self.database.assignments.create_index([
+                ("user_id", 1),
+                ("due_date", 1)
+            ])
+            await self.database.assignments.create_index([
+                ("user_id", 1),
+                ("status", 1)
+            ])
+            logger.info("Created indexes on assignments collection")
+
+            # Course upserts during sync match on (user_id, canvas_id)
+            await self.database.canvas_courses.create_index([
+                ("user_id", 1),
+                ("canvas_id", 1)
+            ], unique=True)
+            logger.info("Created indexes on canvas_courses collection")
+
             # Calendar events indexes
             if "calendar_events" in existing_collections:
                 # Index for user_id + start_time for efficient queries
@@ -78,14 +117,25 @@ class DatabaseManager:
                     ("user_id", 1),
                     ("event_type", 1)
                 ])
-                print("Created indexes on calendar_events collection")
+                # Canvas event upserts match on (user_id, canvas_id)
+                await self.database.calendar_events.create_index([
+                    ("user_id", 1),
+                    ("canvas_id", 1)
+                ])
+                logger.info("Created indexes on calendar_events collection")
+
+            # Canvas response cache - let Mongo expire hard-stale entries
+            if "canvas_cache" in existing_collections:
+                await self.database.canvas_cache.create_index(
+                    "fetched_at", expireAfterSeconds=3600
+                )
+                logger.info("Created TTL index on canvas_cache collection")
 
             # Other indexes will be created as needed when collections are first used
 
         except Exception as e:
             # Don't fail startup if indexes can't be created
-            print(f"Note: Could not create indexes: {e}")
-            pass
+            logger.warning("Could not create indexes: %s", e)
 
 # Global database manager instance
 db_manager = DatabaseManager()
@@ -2,17 +2,92 @@
 Embedding utilities for vector search in CampusMind
 """
 import numpy as np
+import asyncio
+from collections import OrderedDict
 from typing import List, Dict, Any
+import hashlib
 import httpx
+import math
 import os
 
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+except ImportError:
+    import json
+
+    def _loads(data):
+        return json.loads(data)
+
+# Inputs per embeddings request; OpenAI accepts larger batches but this keeps
+# individual request bodies and responses a manageable size
+_EMBED_BATCH_LIMIT = 96
+
+# Concurrency cap for the per-text fallback when a batch call fails
+_EMBED_FANOUT_LIMIT = 16
+
+# Cached embeddings: re-syncs and duplicate descriptions hit the same texts
+# over and over, and a hit is a dict lookup instead of an API round trip
+_EMBED_CACHE_MAX = 10_000
+
+
+def normalize_rows(matrix) -> "np.ndarray":
+    """L2-normalize each row of a matrix (zero rows are left as-is)"""
+    m = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return m / norms
+
+
+def quantize_int8(vec) -> tuple:
+    """Quantize a vector to unit-length int8 bytes plus its dequantization scale"""
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    if norm != 0.0:
+        arr = arr / norm
+    q = np.clip(np.round(arr * 127.0), -128, 127).astype(np.int8)
+    return q.tobytes(), 1.0 / 127.0
+
+
+def dot_int8(a_bytes: bytes, b_bytes: bytes) -> int:
+    """Integer dot product of two int8-quantized vectors.
+
+    Widened to int32 before the dot so the accumulator cannot overflow
+    (1536 dims * 127^2 exceeds int16 range).
+    """
+    a = np.frombuffer(a_bytes, dtype=np.int8).astype(np.int32)
+    b = np.frombuffer(b_bytes, dtype=np.int8).astype(np.int32)
+    return int(np.dot(a, b))
+
 class EmbeddingService:
     """Service for generating embeddings for vector search"""
-    
+
     def __init__(self):
         self.embedding_model = "text-embedding-ada-002"  # OpenAI model
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.embedding_dimension = 1536  # OpenAI ada-002 dimension
+        self._client = None
+        self._cache = OrderedDict()  # sha256(model + text) -> embedding, LRU
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily build one pooled client shared by every embedding call"""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            timeout = httpx.Timeout(30.0, connect=5.0)
+            try:
+                # HTTP/2 multiplexes concurrent embeds over one connection;
+                # needs the h2 extra, so fall back to HTTP/1.1 without it
+                self._client = httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+            except ImportError:
+                self._client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled client (wired into app shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
     
     async def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text using OpenAI API"""
@@ -20,9 +95,64 @@ class EmbeddingService:
             if not self.openai_api_key:
                 # Return dummy embedding for development
                 return [0.0] * self.embedding_dimension
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+
+            cache_key = hashlib.sha256(
+                (self.embedding_model + "\0" + text).encode()
+            ).digest()
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+            response = await self._get_client().post(
+                "https://api.openai.com/v1/embeddings",
+                headers={
+                    "Authorization": f"Bearer {self.openai_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.embedding_model,
+                    "input": text
+                }
+            )
+
+            if response.status_code == 200:
+                # Embedding payloads are large float arrays; orjson (when
+                # installed) parses the raw bytes much faster than stdlib
+                data = _loads(response.content)
+                embedding = data["data"][0]["embedding"]
+
+                # Only successful results are cached; evict oldest when full
+                self._cache[cache_key] = embedding
+                if len(self._cache) > _EMBED_CACHE_MAX:
+                    self._cache.popitem(last=False)
+
+                return embedding
+            else:
+                print(f"OpenAI API error: {response.status_code}")
+                return [0.0] * self.embedding_dimension
+                    
+        except Exception as e:
+            print(f"Error generating embedding: {e}")
+            return [0.0] * self.embedding_dimension
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for multiple texts in batched API calls"""
+        try:
+            if not texts:
+                return []
+
+            if not self.openai_api_key:
+                # Return dummy embeddings for development
+                return [[0.0] * self.embedding_dimension for _ in texts]
+
+            embeddings = []
+            # The embeddings endpoint accepts a list input, so one request
+            # covers a whole batch instead of one round trip per text
+            for start in range(0, len(texts), _EMBED_BATCH_LIMIT):
+                batch = texts[start:start + _EMBED_BATCH_LIMIT]
+
+                response = await self._get_client().post(
                     "https://api.openai.com/v1/embeddings",
                     headers={
                         "Authorization": f"Bearer {self.openai_api_key}",
@@ -30,71 +160,126 @@ class EmbeddingService:
                     },
                     json={
                         "model": self.embedding_model,
-                        "input": text
+                        "input": batch
                     }
                 )
-                
+
                 if response.status_code == 200:
-                    data = response.json()
-                    return data["data"][0]["embedding"]
+                    data = _loads(response.content)
+                    # The API may reorder results; index maps them back
+                    items = sorted(data["data"], key=lambda item: item["index"])
+                    embeddings.extend(item["embedding"] for item in items)
                 else:
                     print(f"OpenAI API error: {response.status_code}")
-                    return [0.0] * self.embedding_dimension
-                    
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return [0.0] * self.embedding_dimension
-    
-    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
-        try:
-            embeddings = []
-            for text in texts:
-                embedding = await self.generate_embedding(text)
-                embeddings.append(embedding)
+                    # Batch call failed; fan out per text instead of giving
+                    # up on the whole batch, bounded so we don't stampede
+                    embeddings.extend(await self._generate_fanout(batch))
+
             return embeddings
         except Exception as e:
             print(f"Error generating batch embeddings: {e}")
             return [[0.0] * self.embedding_dimension] * len(texts)
+
+    async def _generate_fanout(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts individually with bounded concurrency (batch fallback)"""
+        sem = asyncio.Semaphore(_EMBED_FANOUT_LIMIT)
+
+        async def _one(text: str) -> List[float]:
+            # Shared pooled client, so concurrent calls reuse connections
+            async with sem:
+                return await self.generate_embedding(text)
+
+        return list(await asyncio.gather(*(_one(text) for text in texts)))
     
     def cosine_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
         try:
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
-            
-            dot_product = np.dot(vec1, vec2)
-            norm1 = np.linalg.norm(vec1)
-            norm2 = np.linalg.norm(vec2)
-            
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
-            
-            return dot_product / (norm1 * norm2)
-        except Exception as e:
+            vec1 = np.asarray(embedding1, dtype=np.float32)
+            vec2 = np.asarray(embedding2, dtype=np.float32)
+        except (TypeError, ValueError) as e:
             print(f"Error calculating cosine similarity: {e}")
             return 0.0
-    
+
+        # vdot skips norm's dispatch and sqrt per vector; one sqrt suffices
+        denom = math.sqrt(float(np.vdot(vec1, vec1)) * float(np.vdot(vec2, vec2)))
+        if denom == 0.0:
+            return 0.0
+        return float(np.dot(vec1, vec2) / denom)
+
+    def rank_cosine(self, query: List[float], matrix: "np.ndarray", top_k: int) -> "np.ndarray":
+        """Rank pre-normalized matrix rows against a query by cosine similarity.
+
+        Rows of `matrix` must already be unit length (see normalize_rows), so
+        a single matrix-vector product scores every row at once instead of
+        one cosine_similarity call per pair. Returns row indices of the top_k
+        best matches, best first.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm != 0.0:
+            q = q / norm
+        scores = matrix @ q
+        if top_k >= scores.shape[0]:
+            return np.argsort(-scores)
+        # Partial partition beats a full sort when top_k << N
+        idx = np.argpartition(-scores, top_k)[:top_k]
+        return idx[np.argsort(-scores[idx])]
+
     async def prepare_vector_document(
         self, 
         content: str, 
         metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Prepare document for vector storage"""
-        try:
-            embedding = await self.generate_embedding(content)
-            
-            return {
-                "content": content,
-                "embedding": embedding,
-                "metadata": metadata,
-                "vector_dimension": self.embedding_dimension
-            }
-        except Exception as e:
-            print(f"Error preparing vector document: {e}")
-            return {
-                "content": content,
-                "embedding": [0.0] * self.embedding_dimension,
-                "metadata": metadata,
-                "vector_dimension": self.embedding_dimension
-            }
+        # generate_embedding already degrades to a zero vector on any
+        # failure, so no outer try/except is needed here
+        embedding = await self.generate_embedding(content)
+        return self._build_vector_document(content, embedding, metadata)
+
+    async def prepare_vector_documents(
+        self,
+        contents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Prepare many documents with one batched embedding call"""
+        embeddings = await self.generate_embeddings_batch(list(contents))
+        return [
+            self._build_vector_document(content, embedding, metadata)
+            for content, embedding, metadata in zip(contents, embeddings, metadatas)
+        ]
+
+    def _build_vector_document(
+        self,
+        content: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Normalizing once at ingest lets rank_cosine score stored
+        # vectors with a plain dot product at query time
+        unit = normalize_rows([embedding])[0]
+
+        # int8 copy is 4x smaller than float32, so bandwidth-bound
+        # ranking scans move far fewer bytes per document
+        embedding_i8, embedding_scale = quantize_int8(unit)
+
+        return {
+            "content": content,
+            "embedding": embedding,
+            "embedding_unit": unit.tolist(),
+            "embedding_i8": embedding_i8,
+            "embedding_scale": embedding_scale,
+            "metadata": metadata,
+            "vector_dimension": self.embedding_dimension
+        }
+
+
+# Singleton instance
+_embedding_service = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Get the embedding service instance (singleton)"""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService()
+    return _embedding_service
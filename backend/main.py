@@ -5,9 +5,8 @@ Basic user authentication and management API
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import os
+import asyncio
 from dotenv import load_dotenv
-from app.util.db import get_database
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +17,11 @@ from app.util.db import db_manager
 # Import auth utilities
 from app.util.auth import verify_backend_token
 
+# Import shared HTTP clients (closed on shutdown)
+from app.services.canvas_service import async_canvas_service
+from app.util.embed import get_embedding_service
+from app.util import cosine_numba
+
 # Import routers
 from app.routers import user, canvas, assignments, calendar, documents, health, schedule, chat, assignments_vector_simple
 
@@ -34,10 +38,22 @@ async def lifespan(app: FastAPI):
         print(f"Failed to connect to database: {e}")
         raise
 
+    try:
+        await ensure_vector_index()
+    except Exception as e:
+        # Search indexes need Atlas; local mongod just logs and moves on
+        print(f"Vector index setup skipped: {e}")
+
+    # JIT-compile the cosine kernels now (off the loop) so the first
+    # request that ranks vectors doesn't pay the compilation cost
+    await asyncio.to_thread(cosine_numba.warm)
+
     yield
 
     # Shutdown
     print("Shutting down CampusMind API...")
+    await async_canvas_service.aclose()
+    await get_embedding_service().aclose()
     await db_manager.disconnect()
 
 # Create FastAPI application
@@ -88,19 +104,22 @@ async def health_check():
         raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
 
 
-import asyncio
-from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorClient
 from pymongo.operations import SearchIndexModel
 
 INDEX_NAME = "assignments_vs"
 NUM_DIMS = 384  # MiniLM-L6-v2
-@app.get("/protected")
-async def protected_route(user=Depends(verify_backend_token), db=Depends(get_database)):
 
-    MONGODB_URI = os.getenv("MONGODB_URI")
-    client = AsyncIOMotorClient(MONGODB_URI)
-    db = client["campusmind"]
-    collection = db["assignments"]
+
+async def ensure_vector_index():
+    """Create the assignments vector search index if it doesn't already exist"""
+    collection = db_manager.get_database()["assignments"]
+
+    # Skip creation when the index is already registered (queryable or
+    # still building) so startup stays idempotent
+    existing = await collection.list_search_indexes(INDEX_NAME).to_list(length=None)
+    if existing:
+        return
+
     model = SearchIndexModel(
         definition={
             "fields": [
@@ -115,22 +134,14 @@ async def protected_route(user=Depends(verify_backend_token), db=Depends(get_dat
         type="vectorSearch",
     )
 
-    # CREATE (await!)
     name = await collection.create_search_index(model=model)
+    # Atlas builds the index in the background; no need to block startup
+    # polling for it to become queryable
     print(f"New vector index named '{name}' is building.")
 
-    # POLL (await async cursor)
-    print("Polling to check if the index is ready (up to ~1–2 minutes).")
-    while True:
-        cursor = collection.list_search_indexes(name)     # async cursor
-        indexes = await cursor.to_list(length=None)       # ✅ await
-        if indexes and indexes[0].get("queryable") is True:
-            break
-        await asyncio.sleep(5)
-
-    print(f"'{name}' is ready for querying.")
 
-    
+@app.get("/protected")
+async def protected_route(user=Depends(verify_backend_token)):
     return {
         "ok": True,
         "sub": user.get("sub"),